@@ -83,7 +83,7 @@ const AgentLogger: React.FC<AgentLoggerProps> = ({
       const token = localStorage.getItem('auth_token');
 
       // Connect to streaming endpoint with token
-      const streamUrl = `http://127.0.0.1:8000/api/v1/research-stream?topic=${encodeURIComponent(topic)}&token=${token}&max_analysts=2`;
+      const streamUrl = `http://127.0.0.1:8000/api/v1/research-stream?topic=${encodeURIComponent(topic)}&token=${token}&max_analysts=2&session_id=${encodeURIComponent(sessionId)}`;
       console.log('Connecting to stream:', streamUrl); // Debug URL
 
       const eventSource = new EventSource(streamUrl);
@@ -123,11 +123,13 @@ const AgentLogger: React.FC<AgentLoggerProps> = ({
             message = `≡ƒÜÇ Starting research on "${data.topic || topic || 'topic'}"`;
           } else if (data.type === 'event') {
             // Extract actual content from LLM streaming events
-            if (data.event === 'on_chat_model_stream') {
+            const isWriterDelta = data.event === 'on_custom_event' && data.name === 'writer_delta';
+            if (data.event === 'on_chat_model_stream' || isWriterDelta) {
               try {
-                // Parse the data to extract the actual text chunk
+                // Compact streams send the text delta; full streams only have the stringified chunk
                 const dataStr = data.data || '';
-                const chunkMatch = dataStr.match(/content='([^']*)'/);
+                const delta = isWriterDelta ? data.data?.delta : data.delta;
+                const chunkMatch = typeof delta === 'string' ? [null, delta] : dataStr.match(/content='([^']*)'/);
                 if (chunkMatch && chunkMatch[1]) {
                   const chunk = chunkMatch[1];
 
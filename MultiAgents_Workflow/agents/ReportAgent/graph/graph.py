@@ -8,8 +8,10 @@ import os
 
 agent_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(agent_dir))
+sys.path.insert(1, str(agent_dir.parent.parent.parent))
 
 from langgraph.graph import StateGraph, START, END
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
 from langchain_core.runnables import RunnableLambda
 
 # Your existing writer state + node funcs - using absolute imports
@@ -44,8 +46,9 @@ def build_writer_from_markdown_graph() -> StateGraph:
     g.add_edge("export_pdf", END)
     return g
 
-# Compile once at import time
-WRITER_GRAPH = build_writer_from_markdown_graph().compile()
+# Compile once per process; graph.py and mcp_entry.py share the registry entry
+graph_registry.register("writer", lambda: build_writer_from_markdown_graph().compile())
+WRITER_GRAPH = graph_registry.get("writer")
 
 
 # -----------------------------
@@ -289,7 +289,8 @@ def _select_pdf_engine(state: WriterState) -> str:
 def export_pdf(state: WriterState) -> WriterState:
     try:
         os.makedirs("reports", exist_ok=True)
-        base_name = f"{state.get('task','Report').replace(' ','_')[:60]}"
+        # Unique per run: concurrent reports on the same task must not overwrite each other
+        base_name = f"{state.get('task','Report').replace(' ','_')[:60]}-{uuid.uuid4().hex[:12]}"
         out_pdf = f"reports/{base_name}.pdf"
         engine = _select_pdf_engine(state)
 
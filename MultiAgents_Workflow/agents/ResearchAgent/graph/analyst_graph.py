@@ -1,5 +1,6 @@
 from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from MultiAgents_Workflow.agents.ResearchAgent.graph.checkpointer import EvictingCheckpointer
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
 from langgraph.graph.state import CompiledStateGraph
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.analyst_schema import GenerateAnalystState
 from MultiAgents_Workflow.agents.ResearchAgent.utils.personas import create_analyst_personas, human_feedback, should_continue
@@ -16,5 +17,6 @@ builder.add_edge("create_analysts", "human_feedback")
 builder.add_conditional_edges("human_feedback", should_continue, ["create_analysts", END])
 
 # Compile
-memory: MemorySaver = MemorySaver()
-graph: CompiledStateGraph = builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+memory: EvictingCheckpointer = EvictingCheckpointer(name="analyst")
+graph_registry.register("analyst", lambda: builder.compile(interrupt_before=['human_feedback'], checkpointer=memory))
+graph: CompiledStateGraph = graph_registry.get("analyst")
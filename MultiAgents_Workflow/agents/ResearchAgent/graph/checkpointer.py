@@ -0,0 +1,369 @@
+"""Pluggable LangGraph checkpointer with thread eviction and checkpoint compaction.
+
+Backends (CHECKPOINTER_BACKEND):
+  memory   - InMemorySaver, the default; nothing survives a restart
+  sqlite   - AsyncSqliteSaver on CHECKPOINTER_SQLITE_PATH (the checkpoint-sqlite extra)
+  postgres - AsyncPostgresSaver on CHECKPOINTER_POSTGRES_URL (the checkpoint-postgres extra)
+
+Whatever the backend, threads untouched for CHECKPOINT_THREAD_TTL_SECONDS or beyond
+the CHECKPOINT_MAX_THREADS most recently used are deleted, and with
+CHECKPOINT_COMPACT enabled every write drops all but the latest checkpoint of
+its thread, so a thread costs one snapshot rather than its whole history.
+
+The LRU bound only covers threads this process has used. The SQL backends
+also keep what earlier processes wrote, so at most every CHECKPOINT_SWEEP_SECONDS
+the backend is queried for threads whose newest checkpoint is older than the TTL
+and those are deleted too.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.base.id import UUID as CheckpointId
+from langgraph.checkpoint.memory import InMemorySaver
+
+load_dotenv()
+
+
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory").lower()
+CHECKPOINTER_SQLITE_PATH = os.getenv("CHECKPOINTER_SQLITE_PATH", os.path.join(".cache", "checkpoints.sqlite"))
+CHECKPOINTER_POSTGRES_URL = os.getenv("CHECKPOINTER_POSTGRES_URL", "")
+CHECKPOINT_THREAD_TTL_SECONDS = float(os.getenv("CHECKPOINT_THREAD_TTL_SECONDS", "3600"))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "500"))
+CHECKPOINT_COMPACT = os.getenv("CHECKPOINT_COMPACT", "true").lower() not in ("0", "false", "no")
+CHECKPOINT_SWEEP_SECONDS = float(os.getenv("CHECKPOINT_SWEEP_SECONDS", "600"))
+
+_UUID_EPOCH = 0x01B21DD213814000  # 1970-01-01 in the 100 ns ticks since 1582 that uuid6 counts
+
+
+def _checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time a checkpoint was written at, from its (uuid6) id."""
+    try:
+        return (CheckpointId(checkpoint_id).time - _UUID_EPOCH) / 1e7
+    except (TypeError, ValueError):
+        return None
+
+
+class EvictingCheckpointer(BaseCheckpointSaver):
+    """Checkpointer facade that adds TTL/LRU thread eviction and compaction to a backend saver.
+
+    The SQL backends bind to the event loop they are created on, so the inner
+    saver is created lazily on first async use. Sync methods are only available
+    on the memory backend; the research graphs are driven through the async API.
+    """
+
+    def __init__(self, name: str, backend: str = CHECKPOINTER_BACKEND,
+                 ttl_seconds: float = CHECKPOINT_THREAD_TTL_SECONDS,
+                 max_threads: int = CHECKPOINT_MAX_THREADS, compact: bool = CHECKPOINT_COMPACT,
+                 sweep_seconds: float = CHECKPOINT_SWEEP_SECONDS):
+        super().__init__()
+        if backend not in ("memory", "sqlite", "postgres"):
+            raise ValueError(f"Unknown CHECKPOINTER_BACKEND '{backend}'")
+        self.name = name
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.compact = compact
+        self.sweep_seconds = sweep_seconds
+
+        self._inner: Optional[BaseCheckpointSaver] = InMemorySaver() if backend == "memory" else None
+        self._inner_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Future] = None
+
+        self._threads: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while the memory backend's dicts change, so stats() (called from worker threads) can walk them
+        self._memory_lock = threading.Lock()
+        self.evictions = 0
+        self.compactions = 0
+        self.swept = 0
+        self._last_sweep = 0.0
+
+    # -----------------------------
+    # Backend lifecycle
+    # -----------------------------
+    def _create_inner(self) -> BaseCheckpointSaver:
+        if self.backend == "sqlite":
+            try:
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            except ImportError as e:
+                raise ImportError(
+                    "CHECKPOINTER_BACKEND=sqlite needs langgraph-checkpoint-sqlite; "
+                    f"install the checkpoint-sqlite extra (pip install '.[checkpoint-sqlite]'): {e}"
+                ) from e
+
+            os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINTER_SQLITE_PATH)), exist_ok=True)
+            return AsyncSqliteSaver(aiosqlite.connect(CHECKPOINTER_SQLITE_PATH))
+
+        try:
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+        except ImportError as e:
+            raise ImportError(
+                "CHECKPOINTER_BACKEND=postgres needs langgraph-checkpoint-postgres and psycopg-pool; "
+                f"install the checkpoint-postgres extra (pip install '.[checkpoint-postgres]'): {e}"
+            ) from e
+
+        if not CHECKPOINTER_POSTGRES_URL:
+            raise RuntimeError("CHECKPOINTER_POSTGRES_URL must be set for the postgres checkpointer")
+        pool = AsyncConnectionPool(
+            CHECKPOINTER_POSTGRES_URL,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        return AsyncPostgresSaver(pool)
+
+    async def _setup_inner(self, inner: BaseCheckpointSaver):
+        if self.backend == "postgres":
+            await inner.conn.open()
+        await inner.setup()
+        print(f"[checkpointer:{self.name}] {self.backend} backend ready", file=sys.stderr)
+
+    async def _ainner(self) -> BaseCheckpointSaver:
+        if self.backend == "memory":
+            return self._inner
+        loop = asyncio.get_running_loop()
+        if self._inner is None or self._inner_loop is not loop:
+            # No await between the check and the assignment: concurrent callers share one saver
+            self._inner = self._create_inner()
+            self._inner_loop = loop
+            self._ready = asyncio.ensure_future(self._setup_inner(self._inner))
+        await asyncio.shield(self._ready)
+        return self._inner
+
+    async def aclose(self):
+        """Close the backend connection so its worker threads do not outlive the event loop."""
+        inner, self._inner = self._inner, None
+        if self.backend == "memory":
+            self._inner = inner
+            return
+        if inner is not None and self._inner_loop is asyncio.get_running_loop():
+            await inner.conn.close()
+        self._inner_loop = None
+        self._ready = None
+
+    def _sync_inner(self) -> BaseCheckpointSaver:
+        if self._inner is None:
+            raise RuntimeError(f"The {self.backend} checkpointer is async-only; use the graph's async API")
+        return self._inner
+
+    # -----------------------------
+    # Eviction and compaction
+    # -----------------------------
+    def _touch(self, thread_id: str):
+        with self._lock:
+            self._threads[thread_id] = time.time()
+            self._threads.move_to_end(thread_id)
+
+    def _forget(self, thread_id: str):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    def _pick_victims(self) -> list:
+        cutoff = time.time() - self.ttl_seconds
+        victims = []
+        with self._lock:
+            while self._threads:
+                thread_id, last_used = next(iter(self._threads.items()))
+                if last_used > cutoff and len(self._threads) <= self.max_threads:
+                    break
+                self._threads.popitem(last=False)
+                victims.append(thread_id)
+        return victims
+
+    async def _aevict(self, inner: BaseCheckpointSaver):
+        for thread_id in self._pick_victims():
+            await inner.adelete_thread(thread_id)
+            self.evictions += 1
+            print(f"[checkpointer:{self.name}] Evicted thread {thread_id}", file=sys.stderr)
+        await self._asweep(inner)
+
+    async def _asweep(self, inner: BaseCheckpointSaver):
+        """Delete persisted threads idle past the TTL, including those no thread list here knows of."""
+        now = time.time()
+        if now - self._last_sweep < self.sweep_seconds:
+            return
+        self._last_sweep = now
+        # The newest checkpoint of a thread dates its last use, whichever process or checkpointer wrote it
+        query = "SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id FROM checkpoints GROUP BY thread_id"
+        if self.backend == "sqlite":
+            async with inner.lock, inner.conn.execute(query) as cur:
+                rows = list(await cur.fetchall())
+        else:
+            async with inner._cursor() as cur:
+                await cur.execute(query)
+                rows = [(row["thread_id"], row["checkpoint_id"]) for row in await cur.fetchall()]
+        cutoff = now - self.ttl_seconds
+        expired = [thread_id for thread_id, checkpoint_id in rows
+                   if (written := _checkpoint_time(checkpoint_id)) is not None and written < cutoff]
+        for thread_id in expired:
+            self._forget(thread_id)
+            await inner.adelete_thread(thread_id)
+        self.swept += len(expired)
+        if expired:
+            print(f"[checkpointer:{self.name}] Swept {len(expired)} persisted threads idle past the TTL",
+                  file=sys.stderr)
+
+    def _compact_memory(self, inner: InMemorySaver, thread_id: str, checkpoint_ns: str, keep_id: str):
+        checkpoints = inner.storage[thread_id][checkpoint_ns]
+        stale_ids = [cid for cid in checkpoints if cid != keep_id]
+        if not stale_ids:
+            return
+        latest_versions = inner.serde.loads_typed(checkpoints[keep_id][0]).get("channel_versions", {})
+        for cid in stale_ids:
+            old_versions = inner.serde.loads_typed(checkpoints.pop(cid)[0]).get("channel_versions", {})
+            inner.writes.pop((thread_id, checkpoint_ns, cid), None)
+            for channel, version in old_versions.items():
+                if latest_versions.get(channel) != version:
+                    inner.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+        self.compactions += 1
+
+    async def _acompact(self, inner: BaseCheckpointSaver, thread_id: str, checkpoint_ns: str, keep_id: str):
+        if self.backend == "memory":
+            self._compact_memory(inner, thread_id, checkpoint_ns, keep_id)
+            return
+        params = (thread_id, checkpoint_ns, keep_id)
+        if self.backend == "sqlite":
+            async with inner.lock:
+                await inner.conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?", params)
+                await inner.conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?", params)
+                await inner.conn.commit()
+        else:
+            async with inner._cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id != %s", params)
+                await cur.execute(
+                    "DELETE FROM checkpoint_writes WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id != %s", params)
+                await cur.execute(
+                    """DELETE FROM checkpoint_blobs b WHERE b.thread_id = %s AND b.checkpoint_ns = %s
+                       AND NOT EXISTS (
+                           SELECT 1 FROM checkpoints c
+                           WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+                             AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version)""",
+                    (thread_id, checkpoint_ns))
+        self.compactions += 1
+
+    @staticmethod
+    def _memory_size(inner: InMemorySaver) -> int:
+        size = sum(len(c[0][1]) + len(c[1][1]) for ns in inner.storage.values()
+                   for cps in ns.values() for c in cps.values())
+        size += sum(len(b[1]) for b in inner.blobs.values())
+        size += sum(len(w[2][1]) for ws in inner.writes.values() for w in ws.values())
+        return size
+
+    def stats(self) -> dict:
+        with self._lock:
+            threads = len(self._threads)
+        size_bytes = None
+        if self.backend == "memory":
+            inner = self._inner
+            with self._memory_lock:
+                size_bytes = self._memory_size(inner)
+        elif self.backend == "sqlite":
+            size_bytes = sum(os.path.getsize(p) for p in (CHECKPOINTER_SQLITE_PATH, CHECKPOINTER_SQLITE_PATH + "-wal")
+                             if os.path.exists(p))
+        return {
+            "name": self.name,
+            "backend": self.backend,
+            "threads": threads,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+            "swept": self.swept,
+            "size_bytes": size_bytes,
+        }
+
+    # -----------------------------
+    # BaseCheckpointSaver API
+    # -----------------------------
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._sync_inner().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        return self._sync_inner().list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        inner = self._sync_inner()
+        with self._memory_lock:
+            result = inner.put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            self._touch(thread_id)
+            if self.compact and self.backend == "memory":
+                self._compact_memory(inner, thread_id, config["configurable"].get("checkpoint_ns", ""), checkpoint["id"])
+            for victim in self._pick_victims():
+                inner.delete_thread(victim)
+                self.evictions += 1
+                print(f"[checkpointer:{self.name}] Evicted thread {victim}", file=sys.stderr)
+        return result
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        inner = self._sync_inner()
+        with self._memory_lock:
+            inner.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._forget(thread_id)
+        inner = self._sync_inner()
+        with self._memory_lock:
+            inner.delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        inner = await self._ainner()
+        return await inner.aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        inner = await self._ainner()
+        async for item in inner.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        if self.backend == "memory":
+            # InMemorySaver's async methods wrap the sync ones; these take the memory lock
+            return self.put(config, checkpoint, metadata, new_versions)
+        inner = await self._ainner()
+        result = await inner.aput(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._touch(thread_id)
+        if self.compact:
+            await self._acompact(inner, thread_id, config["configurable"].get("checkpoint_ns", ""), checkpoint["id"])
+        await self._aevict(inner)
+        return result
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        if self.backend == "memory":
+            return self.put_writes(config, writes, task_id, task_path)
+        inner = await self._ainner()
+        await inner.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        if self.backend == "memory":
+            return self.delete_thread(thread_id)
+        self._forget(thread_id)
+        inner = await self._ainner()
+        await inner.adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Memory, SQLite and Postgres savers all use "<counter>.<random>" string versions
+        return InMemorySaver.get_next_version(self, current, channel)
@@ -1,11 +1,12 @@
 ﻿from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from MultiAgents_Workflow.agents.ResearchAgent.graph.checkpointer import EvictingCheckpointer
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
 from langgraph.graph.state import CompiledStateGraph
 from langchain_core.messages import HumanMessage
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.main_state import ResearchGraphState
 from MultiAgents_Workflow.agents.ResearchAgent.graph.analyst_graph import create_analyst_personas
 from MultiAgents_Workflow.agents.ResearchAgent.utils.personas import human_feedback
-from MultiAgents_Workflow.agents.ResearchAgent.graph.serach_ask_answer import conduct_all_interviews_node
+from MultiAgents_Workflow.agents.ResearchAgent.graph.serach_ask_answer import conduct_all_interviews_node, interview_checkpointer
 from MultiAgents_Workflow.agents.ResearchAgent.utils.main_util import initialize_all_interview_states
 from MultiAgents_Workflow.agents.ResearchAgent.utils.main_util import write_report
 from MultiAgents_Workflow.agents.ResearchAgent.utils.main_util import write_introduction
@@ -14,6 +15,8 @@ from MultiAgents_Workflow.agents.ResearchAgent.utils.main_util import finalize_r
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.main_state import ResearchGraphState
 
 from dotenv import load_dotenv
+import asyncio
+import uuid
 import os,sys
 
 import importlib
@@ -55,5 +58,32 @@ builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "fi
 builder.add_edge("finalize_report", END)
 
 # Compile
-memory: MemorySaver = MemorySaver()
-graph: CompiledStateGraph = builder.compile(checkpointer=memory)
+memory: EvictingCheckpointer = EvictingCheckpointer(name="research")
+graph_registry.register("research", lambda: builder.compile(checkpointer=memory))
+graph: CompiledStateGraph = graph_registry.get("research")
+
+
+async def close_checkpointers():
+    """Release the research and interview checkpointer connections on the running loop."""
+    await memory.aclose()
+    await interview_checkpointer.aclose()
+
+
+async def main():
+    """Run one research pass from environment options (Coral launcher entry point)."""
+    payload = {
+        "topic": os.getenv("topic") or os.getenv("TOPIC", "Competitive analysis"),
+        "max_analysts": int(os.getenv("max_analysts") or os.getenv("MAX_ANALYSTS", "2")),
+        "human_analyst_feedback": os.getenv("human_analyst_feedback", "continue"),
+    }
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    try:
+        state = await graph.ainvoke(payload, config)
+    finally:
+        await close_checkpointers()
+    print(state.get("final_report", ""))
+    return state
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,19 @@
 ﻿from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.state import CompiledStateGraph
 from langchain_core.messages import HumanMessage
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.research_schema import ResearchState
 from MultiAgents_Workflow.agents.ResearchAgent.utils.questions import generate_questions
-from MultiAgents_Workflow.agents.ResearchAgent.utils.search import search_web, search_wikipedia
+from MultiAgents_Workflow.agents.ResearchAgent.utils.search import plan_search_queries, search_web, search_wikipedia
 from MultiAgents_Workflow.agents.ResearchAgent.utils.answer import generate_answer, save_interview, route_messages
 from MultiAgents_Workflow.agents.ResearchAgent.utils.writer import write_section
+from MultiAgents_Workflow.agents.ResearchAgent.utils.doc_store import doc_stores
+from MultiAgents_Workflow.agents.ResearchAgent.graph.checkpointer import EvictingCheckpointer
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
 from dotenv import load_dotenv
+import asyncio
+import uuid
+import weakref
 import os,sys
 
 load_dotenv()
@@ -18,6 +24,7 @@ load_dotenv()
 # Add nodes and edges
 interview_builder: StateGraph = StateGraph(ResearchState)
 interview_builder.add_node("ask_question", generate_questions)
+interview_builder.add_node("plan_search", plan_search_queries)
 interview_builder.add_node("search_web", search_web)
 interview_builder.add_node("search_wikipedia", search_wikipedia)
 interview_builder.add_node("answer_question", generate_answer)
@@ -26,51 +33,107 @@ interview_builder.add_node("write_section", write_section)
 
 # Flow
 interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
+interview_builder.add_edge("ask_question", "plan_search")
+interview_builder.add_edge("plan_search", "search_web")
+interview_builder.add_edge("plan_search", "search_wikipedia")
 interview_builder.add_edge("search_web", "answer_question")
 interview_builder.add_edge("search_wikipedia", "answer_question")
 interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
 interview_builder.add_edge("save_interview", "write_section")
 interview_builder.add_edge("write_section", END)
 
-async def conduct_all_interviews(state):
-    """Conduct interviews with all analysts and collect their sections."""
-    analysts = state.get("analysts", [])
-    topic = state.get("topic", "Unknown topic")
+# Shared by every interview; threads are deleted as soon as their interview returns
+interview_checkpointer: EvictingCheckpointer = EvictingCheckpointer(name="interview")
+graph_registry.register("interview", lambda: interview_builder.compile(checkpointer=interview_checkpointer))
+
+# Interview concurrency: a process-wide cap shared by every research run, and a
+# per-run cap that can be lowered through the `max_concurrent_interviews` state key.
+MAX_CONCURRENT_INTERVIEWS = int(os.getenv("RESEARCH_MAX_CONCURRENT_INTERVIEWS", "4"))
+INTERVIEW_TIMEOUT_SECONDS = float(os.getenv("RESEARCH_INTERVIEW_TIMEOUT_SECONDS", "300"))
 
-    print(f"[conduct_all_interviews] Starting interviews for {len(analysts)} analysts on topic: {topic}", file=sys.stderr)
+_process_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
-    all_sections = []
 
-    for i, analyst in enumerate(analysts):
-        print(f"[conduct_all_interviews] Interviewing analyst {i+1}/{len(analysts)}: {analyst['name']}", file=sys.stderr)
+def _process_semaphore() -> asyncio.Semaphore:
+    """Return the process-wide interview semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _process_slots.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_INTERVIEWS))
+        _process_slots[loop] = semaphore
+    return semaphore
 
-        # Create interview state for this analyst
-        interview_state = {
-            "analyst": analyst,
-            "messages": [HumanMessage(content=f"So you said you were writing an article on {topic}?")],
-            "max_num_turns": 2,
-            "context": [],
-            "interview": "",
-            "sections": []
-        }
 
-        # Run the interview subgraph for this analyst
-        memory = MemorySaver()
-        interview_graph = interview_builder.compile(checkpointer=memory)
+async def _run_interview(analyst, topic: str, index: int, total: int, run_id: str,
+                         run_slots: asyncio.Semaphore, timeout: float) -> list:
+    """Run the interview subgraph for one analyst and return its sections (empty on failure)."""
+    # Create interview state for this analyst
+    interview_state = {
+        "analyst": analyst,
+        "messages": [HumanMessage(content=f"So you said you were writing an article on {topic}?")],
+        "max_num_turns": 2,
+        "context": [],
+        "interview": "",
+        "sections": [],
+        "search_queries": []
+    }
 
-        config = {"configurable": {"thread_id": f"interview-{analyst['name']}-{topic.replace(' ', '-')[:30]}" }}
+    async with run_slots, _process_semaphore():
+        print(f"[conduct_all_interviews] Interviewing analyst {index+1}/{total}: {analyst['name']}", file=sys.stderr)
+
+        # Run the shared interview subgraph; the thread id keeps this analyst's run separate
+        interview_graph = graph_registry.get("interview")
+
+        thread_id = f"{run_id}:interview-{index}"
+        # Every interview of the run shares the run's document store
+        config = {"configurable": {"thread_id": thread_id, "doc_store": run_id}}
 
         try:
-            result = await interview_graph.ainvoke(interview_state, config)
-            if result and "sections" in result and result["sections"]:
-                all_sections.extend(result["sections"])
-                print(f"[conduct_all_interviews] Analyst {analyst['name']} produced {len(result['sections'])} sections", file=sys.stderr)
-            else:
-                print(f"[conduct_all_interviews] Analyst {analyst['name']} produced no sections", file=sys.stderr)
+            result = await asyncio.wait_for(interview_graph.ainvoke(interview_state, config), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"[conduct_all_interviews] Interview with {analyst['name']} timed out after {timeout}s", file=sys.stderr)
+            return []
         except Exception as e:
             print(f"[conduct_all_interviews] Error interviewing {analyst['name']}: {e}", file=sys.stderr)
+            return []
+        finally:
+            # The sections are handed back to the parent graph; the interview thread is not needed again
+            await interview_checkpointer.adelete_thread(thread_id)
+
+    if result and "sections" in result and result["sections"]:
+        print(f"[conduct_all_interviews] Analyst {analyst['name']} produced {len(result['sections'])} sections", file=sys.stderr)
+        return list(result["sections"])
+    print(f"[conduct_all_interviews] Analyst {analyst['name']} produced no sections", file=sys.stderr)
+    return []
+
+
+async def conduct_all_interviews(state, config: RunnableConfig):
+    """Conduct interviews with all analysts concurrently and collect their sections.
+
+    Interviews are bounded by the process-wide and per-run limits; sections are
+    returned in analyst order regardless of completion order, and a failed or
+    timed-out analyst only drops its own sections.
+    """
+    analysts = state.get("analysts", [])
+    topic = state.get("topic", "Unknown topic")
+    run_id = (config or {}).get("configurable", {}).get("thread_id") or f"run-{uuid.uuid4().hex[:12]}"
+    run_limit = state.get("max_concurrent_interviews") or MAX_CONCURRENT_INTERVIEWS
+    timeout = state.get("interview_timeout") or INTERVIEW_TIMEOUT_SECONDS
+
+    print(f"[conduct_all_interviews] Starting interviews for {len(analysts)} analysts on topic: {topic} "
+          f"(concurrency={run_limit}, timeout={timeout}s)", file=sys.stderr)
+
+    run_slots = asyncio.Semaphore(max(1, int(run_limit)))
+    try:
+        results = await asyncio.gather(*[
+            _run_interview(analyst, topic, i, len(analysts), run_id, run_slots, float(timeout))
+            for i, analyst in enumerate(analysts)
+        ])
+    finally:
+        # Sections are written; no node reads the retrieved documents after this
+        await asyncio.to_thread(doc_stores.release, run_id)
+
+    all_sections = [section for sections in results for section in sections]
 
     print(f"[conduct_all_interviews] Completed all interviews. Total sections: {len(all_sections)}", file=sys.stderr)
     return {"sections": all_sections}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from dotenv import load_dotenv
+
+from MultiAgents_Workflow.agents.ResearchAgent.utils.sqlite_store import SQLiteStore
+
+load_dotenv()
+
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite"))
+LLM_CACHE_NAMESPACE = os.getenv("LLM_CACHE_NAMESPACE", "default")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address of a call: model + parameters (llm_string) and the serialized message list."""
+    canonical = json.dumps({"llm": llm_string, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """Persistent, content-addressed response cache for the shared chat client.
+
+    LangChain hands every chat call to `lookup`/`update` with the serialized
+    message list as `prompt` and the model name plus call parameters as
+    `llm_string`, so identical prompts against the same configuration resolve
+    to the same key. Entries live in SQLite with a TTL and an LRU size limit,
+    and are grouped by namespace so one namespace can be invalidated alone.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, namespace: str = LLM_CACHE_NAMESPACE,
+                 ttl: Optional[float] = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._store = SQLiteStore(path, table="llm_responses", max_entries=max_entries)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = cache_key(prompt, llm_string)
+        entry = self._store.get(self.namespace, key)
+        if entry is None:
+            self._count(False)
+            return None
+        try:
+            generations = [loads(g) for g in json.loads(entry.value)]
+        except Exception as e:
+            print(f"[llm_cache] Dropping unreadable entry {key[:12]}: {e}", file=sys.stderr)
+            self._store.delete(self.namespace, key)
+            self._count(False)
+            return None
+        self._count(True)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = cache_key(prompt, llm_string)
+        try:
+            payload = json.dumps([dumps(g) for g in return_val]).encode("utf-8")
+        except Exception as e:
+            print(f"[llm_cache] Not caching unserializable response: {e}", file=sys.stderr)
+            return
+        self._store.set(self.namespace, key, payload, ttl=self.ttl)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Invalidate the cache; pass `namespace=...` to drop a single namespace."""
+        namespace = kwargs.get("namespace")
+        removed = self._store.clear(namespace)
+        print(f"[llm_cache] Cleared {removed} entries (namespace={namespace or '*'})", file=sys.stderr)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "entries": self._store.count(self.namespace),
+        }
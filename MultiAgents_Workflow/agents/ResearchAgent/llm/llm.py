@@ -1,14 +1,117 @@
 ﻿from langchain_openai import ChatOpenAI
+from pydantic import PrivateAttr
 import os
+import time
 from dotenv import load_dotenv
+from MultiAgents_Workflow.agents.ResearchAgent.llm.cache import LLMResponseCache
+from MultiAgents_Workflow.agents.ResearchAgent.llm.rate_limit import call_priority, estimate_tokens, llm_rate_limiter
 
 
 load_dotenv()
 
 
-chat = ChatOpenAI(
+# Persistent response cache; set LLM_CACHE_ENABLED=false to always hit the API
+llm_cache = LLMResponseCache() if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no") else None
+
+
+def _used_tokens(result) -> int | None:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+
+class RateLimitedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose API calls (not cache hits) are admitted by `llm_rate_limiter` first.
+
+    `call_stats`, when set, gets `record(latency_seconds, total_tokens)` or `error()` for every API call.
+    """
+
+    _call_stats: object = PrivateAttr(default=None)
+
+    @classmethod
+    def lc_id(cls) -> list[str]:
+        # Serialize as ChatOpenAI so LLM cache keys stay the same
+        return ChatOpenAI.lc_id()
+
+    def get_name(self, suffix: str | None = None, *, name: str | None = None) -> str:
+        # Same run name in traces and streamed events, and in the serialized form the cache hashes
+        return super().get_name(suffix, name=name or self.name or "ChatOpenAI")
+
+    def with_call_stats(self, stats) -> "RateLimitedChatOpenAI":
+        self._call_stats = stats
+        return self
+
+    def _admission(self, messages, run_manager) -> tuple[str, int]:
+        return call_priority(run_manager), estimate_tokens(messages, self.max_tokens)
+
+    def _done(self, priority: str, reserved: int, used: int | None, started: float):
+        llm_rate_limiter.settle(reserved, used, priority)
+        if self._call_stats is not None:
+            self._call_stats.record(time.perf_counter() - started, used)
+
+    def _failed(self):
+        if self._call_stats is not None:
+            self._call_stats.error()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        priority, reserved = self._admission(messages, run_manager)
+        await llm_rate_limiter.acquire(reserved, priority)
+        started = time.perf_counter()
+        try:
+            result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception:
+            self._failed()
+            raise
+        self._done(priority, reserved, _used_tokens(result), started)
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        priority, reserved = self._admission(messages, run_manager)
+        await llm_rate_limiter.acquire(reserved, priority)
+        started = time.perf_counter()
+        used = None
+        try:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    used = usage.get("total_tokens")
+                yield chunk
+        except Exception:
+            self._failed()
+            raise
+        self._done(priority, reserved, used, started)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        priority, reserved = self._admission(messages, run_manager)
+        llm_rate_limiter.acquire_sync(reserved, priority)
+        started = time.perf_counter()
+        try:
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception:
+            self._failed()
+            raise
+        self._done(priority, reserved, _used_tokens(result), started)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        priority, reserved = self._admission(messages, run_manager)
+        llm_rate_limiter.acquire_sync(reserved, priority)
+        started = time.perf_counter()
+        used = None
+        try:
+            for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    used = usage.get("total_tokens")
+                yield chunk
+        except Exception:
+            self._failed()
+            raise
+        self._done(priority, reserved, used, started)
+
+
+chat = RateLimitedChatOpenAI(
     model="gpt-4o-mini",
     temperature=0,
-    api_key=os.getenv("OPENAI_API_KEY")
+    api_key=os.getenv("OPENAI_API_KEY"),
+    cache=llm_cache
 )
-
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Account limits for the model; 0 disables that bucket. Defaults are OpenAI tier-1 limits for gpt-4o-mini.
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+# Largest burst, in seconds of quota; the API enforces its limits over windows shorter than a minute
+LLM_RATE_BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", "10"))
+# Completion tokens reserved for a call that does not set max_tokens; corrected once usage is known
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "600"))
+LLM_PRIORITIES = {"interactive": 0, "batch": 10}
+LLM_DEFAULT_PRIORITY = os.getenv("LLM_DEFAULT_PRIORITY", "interactive")
+
+
+def estimate_tokens(messages, completion_tokens: Optional[int] = None) -> int:
+    """Rough prompt+completion size: ~4 characters per token plus per-message overhead."""
+    chars = 0
+    count = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        chars += len(content) if isinstance(content, str) else len(str(content))
+        count += 1
+    return chars // 4 + 4 * count + (completion_tokens or LLM_COMPLETION_TOKENS_ESTIMATE)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        # A call larger than the whole bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "wake")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimiter:
+    """
+    Process-wide RPM/TPM token buckets in front of the chat model.
+
+    Calls wait in one priority queue (lower value first, FIFO within a priority);
+    only the head of the queue may take from the buckets, so a burst of batch
+    work cannot starve interactive runs and nobody is admitted out of order.
+    Each call reserves its estimated tokens; `settle` corrects the bucket with
+    the usage the API reports.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, burst_seconds: float = LLM_RATE_BURST_SECONDS):
+        self.requests = _Bucket(rpm, burst_seconds) if rpm > 0 else None
+        self.tokens = _Bucket(tpm, burst_seconds) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: dict[str, dict] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def _admit(self, waiter: _Waiter) -> Optional[float]:
+        """Under the lock: None if `waiter` was admitted, else how long to wait before retrying."""
+        if self._queue[0] is not waiter:
+            return math.inf
+        now = time.monotonic()
+        delay = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, waiter.tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                delay = max(delay, bucket.delay(amount))
+        if delay > 0:
+            return delay
+        if self.requests is not None:
+            self.requests.level -= 1
+        if self.tokens is not None:
+            self.tokens.level -= waiter.tokens
+        heapq.heappop(self._queue)
+        if self._queue:
+            self._queue[0].wake()
+        return None
+
+    def _enqueue(self, priority: str, tokens: int, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(LLM_PRIORITIES.get(priority, LLM_PRIORITIES[LLM_DEFAULT_PRIORITY]), next(self._seq), tokens, wake)
+        with self._lock:
+            head = self._queue[0] if self._queue else None
+            heapq.heappush(self._queue, waiter)
+            if head is not None and self._queue[0] is waiter:
+                head.wake()  # it was sleeping as head; let it notice it no longer is
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                if self._queue:
+                    self._queue[0].wake()
+
+    def _record(self, priority: str, waited: float, tokens: int):
+        with self._lock:
+            stats = self._stats.setdefault(priority, {"calls": 0, "throttled": 0, "wait_seconds": 0.0,
+                                                      "max_wait_seconds": 0.0, "tokens_reserved": 0,
+                                                      "tokens_used": 0})
+            stats["calls"] += 1
+            stats["throttled"] += waited > 0.001
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            stats["tokens_reserved"] += tokens
+
+    async def acquire(self, tokens: int, priority: str = LLM_DEFAULT_PRIORITY) -> float:
+        """Wait for a slot for a call of about `tokens` tokens; returns the seconds waited."""
+        if not self.enabled:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        start = time.monotonic()
+        waiter = self._enqueue(priority, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                event.clear()  # before checking, so a wake-up in between is not lost
+                with self._lock:
+                    delay = self._admit(waiter)
+                if delay is None:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), None if delay == math.inf else delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        waited = time.monotonic() - start
+        self._record(priority, waited, tokens)
+        return waited
+
+    def acquire_sync(self, tokens: int, priority: str = LLM_DEFAULT_PRIORITY) -> float:
+        """Blocking `acquire`, for calls made from worker threads."""
+        if not self.enabled:
+            return 0.0
+        event = threading.Event()
+        start = time.monotonic()
+        waiter = self._enqueue(priority, tokens, event.set)
+        try:
+            while True:
+                event.clear()  # before checking, so a wake-up in between is not lost
+                with self._lock:
+                    delay = self._admit(waiter)
+                if delay is None:
+                    break
+                event.wait(None if delay == math.inf else delay)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        waited = time.monotonic() - start
+        self._record(priority, waited, tokens)
+        return waited
+
+    def settle(self, reserved: int, used: Optional[int], priority: str = LLM_DEFAULT_PRIORITY):
+        """Return (or charge) the difference between the reserved and the reported token count."""
+        if used is None or self.tokens is None:
+            return
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+            if priority in self._stats:
+                self._stats[priority]["tokens_used"] += used
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_priority = {
+                name: {
+                    "calls": s["calls"],
+                    "throttled": s["throttled"],
+                    "avg_wait_ms": round(s["wait_seconds"] * 1000 / s["calls"], 2) if s["calls"] else 0,
+                    "max_wait_ms": round(s["max_wait_seconds"] * 1000, 2),
+                    "tokens_reserved": s["tokens_reserved"],
+                    "tokens_used": s["tokens_used"],
+                }
+                for name, s in self._stats.items()
+            }
+            return {
+                "enabled": self.enabled,
+                "rpm": round(self.requests.rate * 60) if self.requests else None,
+                "tpm": round(self.tokens.rate * 60) if self.tokens else None,
+                "queued": len(self._queue),
+                "requests_available": round(self.requests.level, 1) if self.requests else None,
+                "tokens_available": round(self.tokens.level) if self.tokens else None,
+                "priorities": per_priority,
+            }
+
+
+def call_priority(run_manager: Any) -> str:
+    """Priority of a call from its run metadata (`llm_priority`), e.g. set by the API per request."""
+    metadata = getattr(run_manager, "metadata", None) or {}
+    priority = metadata.get("llm_priority", LLM_DEFAULT_PRIORITY)
+    if priority not in LLM_PRIORITIES:
+        print(f"[rate_limit] Unknown llm_priority '{priority}', using {LLM_DEFAULT_PRIORITY}", file=sys.stderr)
+        return LLM_DEFAULT_PRIORITY
+    return priority
+
+
+llm_rate_limiter = RateLimiter()
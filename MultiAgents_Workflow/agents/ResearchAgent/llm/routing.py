@@ -0,0 +1,204 @@
+"""Per-node model routing.
+
+Every graph node that calls the model asks `get_chat(config)` for it. The node
+name (LangGraph puts it in the run metadata) is looked up in the routing table
+to pick a model profile: model, temperature, max_tokens, timeout, and
+optionally an OpenAI-compatible base_url for a local stand-in model.
+
+Cheap, structured stages (analyst personas, interview questions, search
+planning) default to the bounded "fast" profile; answers and report writing
+use "default", which matches the original single model so its cached
+responses stay valid.
+
+Deployments add or override profiles with LLM_PROFILES, e.g.
+    {"fast": {"model": "llama3.1:8b", "base_url": "http://localhost:11434/v1"}}
+and remap nodes with LLM_ROUTES, e.g. {"ask_question": "default"}. A request
+can remap nodes to existing profiles through `llm_routes` in the run metadata
+("*" applies to every node).
+"""
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+
+from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import RateLimitedChatOpenAI, chat, llm_cache
+
+load_dotenv()
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    name: str
+    model: str = "gpt-4o-mini"
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+    base_url: Optional[str] = None
+    api_key_env: str = "OPENAI_API_KEY"
+
+
+DEFAULT_PROFILE = "default"
+
+_BUILTIN_PROFILES = {
+    "default": ModelProfile("default"),
+    "fast": ModelProfile("fast", max_tokens=1024, timeout=30),
+}
+
+_BUILTIN_ROUTES = {
+    "create_analysts": "fast",
+    "ask_question": "fast",
+    "plan_search": "fast",
+}
+
+
+def _json_env(name: str) -> dict:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"{name} is not valid JSON: {e}") from e
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return value
+
+
+def _load_profiles() -> dict:
+    profiles = dict(_BUILTIN_PROFILES)
+    for name, spec in _json_env("LLM_PROFILES").items():
+        base = profiles.get(name, ModelProfile(name))
+        profiles[name] = replace(base, **{**spec, "name": name})
+    return profiles
+
+
+def _load_routes(profiles: dict) -> dict:
+    routes = {**_BUILTIN_ROUTES, **_json_env("LLM_ROUTES")}
+    for node, profile in routes.items():
+        if profile not in profiles:
+            raise ValueError(f"LLM_ROUTES sends '{node}' to unknown profile '{profile}'")
+    return routes
+
+
+LLM_PROFILES = _load_profiles()
+LLM_ROUTES = _load_routes(LLM_PROFILES)
+
+
+class ProfileStats:
+    """Latency and token usage of the API calls made through one profile (cache hits excluded)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.tokens = 0
+
+    def record(self, latency: float, tokens: Optional[int]):
+        with self._lock:
+            self.calls += 1
+            self.latency_seconds += latency
+            self.max_latency_seconds = max(self.max_latency_seconds, latency)
+            self.tokens += tokens or 0
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.latency_seconds * 1000 / self.calls, 2) if self.calls else 0,
+                "max_latency_ms": round(self.max_latency_seconds * 1000, 2),
+                "tokens": self.tokens,
+                "avg_tokens": round(self.tokens / self.calls, 1) if self.calls else 0,
+            }
+
+
+_models: dict[str, RateLimitedChatOpenAI] = {}
+_stats: dict[str, ProfileStats] = {name: ProfileStats() for name in LLM_PROFILES}
+_node_calls: dict[str, dict[str, int]] = {}
+_models_lock = threading.Lock()
+
+
+def _build(profile: ModelProfile) -> RateLimitedChatOpenAI:
+    if profile.name == DEFAULT_PROFILE and profile == _BUILTIN_PROFILES[DEFAULT_PROFILE]:
+        model = chat  # the module-level model; its cache keys predate routing
+    else:
+        kwargs = {}
+        if profile.max_tokens is not None:
+            kwargs["max_tokens"] = profile.max_tokens
+        if profile.timeout is not None:
+            kwargs["timeout"] = profile.timeout
+        if profile.base_url:
+            kwargs["base_url"] = profile.base_url
+        model = RateLimitedChatOpenAI(
+            model=profile.model,
+            temperature=profile.temperature,
+            # Local OpenAI-compatible servers usually ignore the key but the client requires one
+            api_key=os.getenv(profile.api_key_env) or ("unused" if profile.base_url else None),
+            cache=llm_cache,
+            **kwargs
+        )
+    return model.with_call_stats(_stats[profile.name])
+
+
+def get_model(profile_name: str) -> RateLimitedChatOpenAI:
+    """The (shared) chat model for a profile."""
+    model = _models.get(profile_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(profile_name)
+            if model is None:
+                model = _models[profile_name] = _build(LLM_PROFILES[profile_name])
+    return model
+
+
+def validate_routes(routes: Optional[dict]) -> dict:
+    """Check per-request route overrides; raises ValueError on an unknown profile."""
+    routes = routes or {}
+    for node, profile in routes.items():
+        if profile not in LLM_PROFILES:
+            raise ValueError(f"Unknown model profile '{profile}' for '{node}'; "
+                             f"expected one of {sorted(LLM_PROFILES)}")
+    return dict(routes)
+
+
+def route(node: Optional[str], overrides: Optional[dict] = None) -> str:
+    """Profile name for `node`, applying per-request overrides first."""
+    overrides = overrides or {}
+    profile = overrides.get(node) or overrides.get("*") or LLM_ROUTES.get(node) or DEFAULT_PROFILE
+    if profile not in LLM_PROFILES:
+        print(f"[routing] Unknown profile '{profile}' for node '{node}', using {DEFAULT_PROFILE}", file=sys.stderr)
+        return DEFAULT_PROFILE
+    return profile
+
+
+def get_chat(config: Optional[RunnableConfig] = None) -> RateLimitedChatOpenAI:
+    """The chat model routed to the node running under `config`."""
+    metadata = (config or {}).get("metadata") or {}
+    node = metadata.get("langgraph_node")
+    profile = route(node, metadata.get("llm_routes"))
+    with _models_lock:
+        per_node = _node_calls.setdefault(node or "-", {})
+        per_node[profile] = per_node.get(profile, 0) + 1
+    return get_model(profile)
+
+
+def routing_stats() -> dict:
+    return {
+        "routes": dict(LLM_ROUTES),
+        "profiles": {
+            name: {**asdict(profile), **_stats[name].snapshot()}
+            for name, profile in LLM_PROFILES.items()
+        },
+        "node_calls": {node: dict(calls) for node, calls in _node_calls.items()},
+    }
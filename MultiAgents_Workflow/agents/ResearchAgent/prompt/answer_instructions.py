@@ -20,6 +20,7 @@ You are an expert being interviewed by an analyst. Your response must strictly a
 
 2. **Source Citations:**
    - The context includes sources at the beginning of each individual document.
+   - Each document has an `id`; cite a document by its id, e.g. `[2]` for `<Document id="2" .../>`.
    - For every statement based on the provided context, cite the relevant source directly after the statement in brackets. Example: `[1]`.
 
 3. **Citation Format:**
@@ -74,3 +74,12 @@ Return only a structured search query in the specified format below. Do not incl
 }}
 
 """
+
+
+# Appended to `search_instructions` when the planner may return several queries.
+multi_query_addendum = """
+**Multiple Queries:**
+- You may return up to {max_queries} complementary search queries when the final question covers several distinct aspects.
+- In that case use this format instead: {{"search_queries": ["first query", "second query"]}}
+- Each query must stand on its own; do not repeat the same query with minor wording changes.
+"""
@@ -7,6 +7,7 @@ You are an expert technical writer. Your task is to create a concise, easily dig
 
 1. **Analyze the Source Documents:**
    - Each document is labeled at the start with a `<Document>` tag. Use this information to identify and refer to the sources.
+   - A document's `id` is its source number; cite it as `[id]` and list it under that number.
 
 2. **Report Structure:**
    - Format the report using **Markdown**:
@@ -21,6 +21,8 @@ class ResearchGraphState(TypedDict):
     max_analysts: int
     human_analyst_feedback: str
     analysts : list[Analyst]
+    max_concurrent_interviews: int  # optional per-run cap on parallel interviews
+    interview_timeout: float  # optional per-analyst timeout in seconds
     sections : Annotated[list,operator.add]
     introduction:str
     content:str
@@ -15,10 +15,11 @@ class Interview(BaseMessage):
 
 class ResearchState(MessagesState):
     max_num_turns:int
-    context: Annotated[list,operator.add]
+    context: Annotated[list,operator.add]  # document references (see utils/doc_store.py) and fallback strings
     analyst: Analyst
     interview:str
     sections: list
+    search_queries: list  # planned once per turn, read by both retrievers
 
 class SearchQuery(BaseModel):
     search_query: str = Field(None,description="Search query for retrieval")
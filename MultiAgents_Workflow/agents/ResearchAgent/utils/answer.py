@@ -1,22 +1,29 @@
 ﻿from MultiAgents_Workflow.agents.ResearchAgent.schemas.research_schema import ResearchState
 from MultiAgents_Workflow.agents.ResearchAgent.prompt.answer_instructions import answer_instructions
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import get_chat
+from MultiAgents_Workflow.agents.ResearchAgent.utils.context_packer import ANSWER_CONTEXT_TOKENS, last_question, packed_context
+from MultiAgents_Workflow.agents.ResearchAgent.utils.doc_store import resolve_context
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import get_buffer_string
 from langchain_core.messages import AIMessage
+import asyncio
 import sys
 
 
 
-def generate_answer(state: ResearchState):
+async def generate_answer(state: ResearchState, config: RunnableConfig):
     """Generate an answer to the analyst's question."""
 
     analyst = state['analyst']
     messages = state['messages']
-    context = state['context']
+    # Only the chunks most relevant to the latest question, within the token budget
+    documents = await asyncio.to_thread(resolve_context, state['context'], config)
+    context = await asyncio.to_thread(packed_context, documents, last_question(messages, analyst['persona']),
+                                      ANSWER_CONTEXT_TOKENS, label=f"answer:{analyst['name']}")
 
     system_message = answer_instructions.format(goals=analyst['persona'],context=context)
-    answer = chat.invoke([SystemMessage(content=system_message)] + messages)
+    answer = await get_chat(config).ainvoke([SystemMessage(content=system_message)] + messages)
 
     answer.name = 'expert'
 
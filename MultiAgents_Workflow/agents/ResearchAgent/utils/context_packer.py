@@ -0,0 +1,317 @@
+"""Token-budgeted context packing for the answer and section prompts.
+
+The interview `context` grows every turn with whole search results. Instead of
+formatting all of it into a prompt, `pack_context` splits the documents into
+passage-sized chunks, drops exact duplicates and boilerplate, ranks the rest
+against the current question with BM25 and keeps the best chunks that fit the
+token budget. Kept chunks are regrouped under their document, in document
+order, and each document gets a citation id that depends only on where its
+source first appeared in the context, so ids stay the same from turn to turn.
+"""
+import hashlib
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:  # optional: token counts are estimated from characters instead
+    tiktoken = None
+
+load_dotenv()
+
+
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() not in ("0", "false", "no")
+ANSWER_CONTEXT_TOKENS = int(os.getenv("ANSWER_CONTEXT_TOKENS", "3000"))
+SECTION_CONTEXT_TOKENS = int(os.getenv("SECTION_CONTEXT_TOKENS", "6000"))
+CONTEXT_CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", "200"))
+CONTEXT_TOKENIZER_MODEL = os.getenv("CONTEXT_TOKENIZER_MODEL", "gpt-4o-mini")
+
+_document_re = re.compile(r"<Document\b([^>]*?)/?>\s*(.*?)\s*</Document>", re.DOTALL)
+_attr_re = re.compile(r'(\w+)="([^"]*)"')
+_paragraph_re = re.compile(r"\n\s*\n+")
+_sentence_re = re.compile(r"(?<=[.!?])\s+")
+_word_re = re.compile(r"\w+", re.UNICODE)
+# Navigation, consent and footer text that search results often carry along
+_boilerplate_re = re.compile(
+    r"\b(cookies?|privacy policy|terms of (use|service)|all rights reserved|subscribe|sign up|log in|"
+    r"newsletter|javascript|skip to (main )?content|advertisement|share this|follow us)\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what "
+    "which who will with how why when does do can".split()
+)
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Model tokens in `text`; about 4 characters per token when tiktoken is unavailable."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed and tiktoken is not None:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    _encoding = tiktoken.encoding_for_model(CONTEXT_TOKENIZER_MODEL)
+                except Exception as e:  # unknown model, or the encoding cannot be downloaded
+                    print(f"[context_packer] tiktoken unavailable ({e}); estimating tokens", file=sys.stderr)
+                    _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class SourceDocument:
+    source: str
+    title: str
+    content: str
+
+
+def format_document(doc: SourceDocument) -> str:
+    """The `<Document href=...>` layout the retrievers produce."""
+    if not doc.source and not doc.title:
+        return doc.content
+    attrs = f'href="{doc.source}"' + (f' title="{doc.title}"' if doc.title else "")
+    return f"<Document {attrs}/>\n{doc.content}\n</Document>"
+
+
+def parse_documents(context: Iterable) -> List[SourceDocument]:
+    """Split context entries (documents, or formatted `<Document href|source=...>` blocks) into documents."""
+    documents = []
+    for entry in context or []:
+        if isinstance(entry, SourceDocument):
+            documents.append(entry)
+            continue
+        text = entry if isinstance(entry, str) else str(entry)
+        matches = list(_document_re.finditer(text))
+        if not matches:
+            if text.strip():
+                documents.append(SourceDocument("", "", text.strip()))
+            continue
+        for match in matches:
+            attrs = dict(_attr_re.findall(match.group(1)))
+            source = attrs.get("href") or attrs.get("source") or ""
+            documents.append(SourceDocument(source, attrs.get("title", ""), match.group(2).strip()))
+    return documents
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _word_re.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _passages(text: str, chunk_tokens: int) -> List[str]:
+    """Paragraphs of `text`; paragraphs longer than `chunk_tokens` are split on sentences."""
+    pieces = []
+    for paragraph in _paragraph_re.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= chunk_tokens:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(s.strip() for s in _sentence_re.split(paragraph) if s.strip())
+    return pieces
+
+
+def _pack_passages(pieces: List[str], chunk_tokens: int) -> List[str]:
+    """Consecutive passages joined into chunks of up to `chunk_tokens`."""
+    chunks, buf, size = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if buf and size + tokens > chunk_tokens:
+            chunks.append(" ".join(buf))
+            buf, size = [], 0
+        buf.append(piece)
+        size += tokens
+    if buf:
+        chunks.append(" ".join(buf))
+    return chunks
+
+
+def _is_boilerplate(text: str) -> bool:
+    words = _word_re.findall(text)
+    if len(words) < 4:
+        return True
+    # Short passages dominated by navigation/consent phrases carry no content
+    return len(words) < 40 and len(_boilerplate_re.findall(text)) >= 2
+
+
+@dataclass
+class _Chunk:
+    doc: int
+    position: int
+    text: str
+    tokens: int
+    terms: List[str]
+    score: float = 0.0
+
+
+def _bm25(chunks: List[_Chunk], query: str, k1: float = 1.5, b: float = 0.75):
+    query_terms = set(_terms(query))
+    if not chunks or not query_terms:
+        return
+    avg_len = sum(len(c.terms) for c in chunks) / len(chunks) or 1.0
+    df = Counter(t for c in chunks for t in set(c.terms) if t in query_terms)
+    n = len(chunks)
+    for chunk in chunks:
+        tf = Counter(t for t in chunk.terms if t in query_terms)
+        length_norm = k1 * (1 - b + b * len(chunk.terms) / avg_len)
+        chunk.score = sum(
+            math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) * tf[t] * (k1 + 1) / (tf[t] + length_norm)
+            for t in tf
+        )
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens_in: int
+    tokens_out: int
+    chunks_total: int
+    chunks_kept: int
+    duplicates: int  # passages
+    boilerplate: int  # passages
+    citations: dict = field(default_factory=dict)  # citation id -> source
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_in - self.tokens_out)
+
+
+class PackerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.duplicates = 0
+        self.boilerplate = 0
+
+    def record(self, packed: PackedContext):
+        with self._lock:
+            self.calls += 1
+            self.tokens_in += packed.tokens_in
+            self.tokens_out += packed.tokens_out
+            self.duplicates += packed.duplicates
+            self.boilerplate += packed.boilerplate
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": CONTEXT_PACKING_ENABLED,
+                "calls": self.calls,
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "tokens_saved": max(0, self.tokens_in - self.tokens_out),
+                "avg_tokens_saved": round(max(0, self.tokens_in - self.tokens_out) / self.calls, 1) if self.calls else 0,
+                "duplicate_passages": self.duplicates,
+                "boilerplate_passages": self.boilerplate,
+            }
+
+
+packer_stats = PackerStats()
+
+
+def _render(documents: List[SourceDocument], ids: List[int], chunks_by_doc: dict) -> str:
+    blocks = []
+    for index in sorted(chunks_by_doc, key=lambda i: (ids[i], i)):
+        doc = documents[index]
+        attrs = f'id="{ids[index]}"'
+        if doc.source:
+            attrs += f' source="{doc.source}"'
+        if doc.title:
+            attrs += f' title="{doc.title}"'
+        body = "\n...\n".join(c.text for c in sorted(chunks_by_doc[index], key=lambda c: c.position))
+        blocks.append(f"<Document {attrs}/>\n{body}\n</Document>")
+    return "\n\n---\n\n".join(blocks)
+
+
+def pack_context(context: Iterable, query: str, budget: int, label: str = "context",
+                 chunk_tokens: int = CONTEXT_CHUNK_TOKENS) -> PackedContext:
+    """Best chunks of `context` for `query` within `budget` tokens, grouped by document with citation ids."""
+    context = list(context or [])
+    documents = parse_documents(context)
+    # Measured against the whole context formatted into the prompt, as before packing
+    tokens_in = count_tokens(_unpacked(documents)) if documents else 0
+
+    # Citation ids follow the first appearance of each source, so appending context never renumbers it
+    ids, by_source = [], {}
+    for index, doc in enumerate(documents):
+        key = doc.source or f"#{index}"
+        ids.append(by_source.setdefault(key, len(by_source) + 1))
+
+    # Duplicates and boilerplate are dropped per passage, before passages are joined into chunks
+    chunks, seen = [], set()
+    total = duplicates = boilerplate = 0
+    for index, doc in enumerate(documents):
+        kept = []
+        for text in _passages(doc.content, chunk_tokens):
+            total += 1
+            digest = hashlib.blake2b(" ".join(_word_re.findall(text.lower())).encode(), digest_size=16).digest()
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            if _is_boilerplate(text):
+                boilerplate += 1
+                continue
+            kept.append(text)
+        for position, text in enumerate(_pack_passages(kept, chunk_tokens)):
+            chunks.append(_Chunk(index, position, text, count_tokens(text), _terms(text)))
+
+    _bm25(chunks, query)
+    chunks_by_doc: dict = {}
+    used = 0
+    # Highest score first; ties keep context order, so with no usable query the oldest context wins
+    for chunk in sorted(chunks, key=lambda c: -c.score):
+        if used + chunk.tokens > budget:
+            continue
+        chunks_by_doc.setdefault(chunk.doc, []).append(chunk)
+        used += chunk.tokens
+
+    text = _render(documents, ids, chunks_by_doc)
+    packed = PackedContext(
+        text=text,
+        tokens_in=tokens_in,
+        tokens_out=count_tokens(text) if text else 0,
+        chunks_total=len(chunks),
+        chunks_kept=sum(len(c) for c in chunks_by_doc.values()),
+        duplicates=duplicates,
+        boilerplate=boilerplate,
+        citations={ids[i]: documents[i].source for i in chunks_by_doc if documents[i].source},
+    )
+    packer_stats.record(packed)
+    print(f"[context_packer] {label}: {packed.tokens_in} -> {packed.tokens_out} tokens "
+          f"({packed.tokens_saved} saved; kept {packed.chunks_kept}/{packed.chunks_total} chunks, "
+          f"dropped {duplicates} duplicate and {boilerplate} boilerplate passages of {total})", file=sys.stderr)
+    return packed
+
+
+def _unpacked(documents: List[SourceDocument]) -> str:
+    return "\n\n---\n\n".join(format_document(d) for d in documents)
+
+
+def packed_context(context: Iterable, query: str, budget: int, label: str = "context") -> str:
+    """Prompt-ready context: packed when CONTEXT_PACKING_ENABLED, else every document in full."""
+    if not CONTEXT_PACKING_ENABLED:
+        return _unpacked(parse_documents(context))
+    return pack_context(context, query, budget, label).text
+
+
+def last_question(messages: list, fallback: Optional[str] = "") -> str:
+    """Text of the latest analyst (non-expert) message, used as the ranking query."""
+    for message in reversed(messages or []):
+        if getattr(message, "name", None) != "expert":
+            return getattr(message, "content", "") or fallback or ""
+    return fallback or ""
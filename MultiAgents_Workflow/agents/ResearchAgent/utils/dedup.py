@@ -0,0 +1,103 @@
+"""Near-duplicate detection for retrieved documents (MinHash with LSH banding).
+
+A document's word shingles are summarised by a MinHash signature; two
+signatures agree in a fraction of positions that estimates the Jaccard
+similarity of the shingle sets. Signatures are split into bands and bucketed,
+so only documents sharing a band are compared. A document whose estimated
+similarity to one already indexed reaches DEDUP_THRESHOLD is a near-duplicate
+of it - e.g. the same article syndicated under another URL, or a Wikipedia
+page returned for two different queries with a slightly different excerpt.
+"""
+import hashlib
+import os
+import random
+import re
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() not in ("0", "false", "no")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+DEDUP_PERMUTATIONS = int(os.getenv("DEDUP_PERMUTATIONS", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures must be comparable across interviews and processes
+_rng = random.Random(0x5EED)
+_PERMUTATIONS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(DEDUP_PERMUTATIONS)
+]
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_WORDS) -> set:
+    """Hashed word `size`-grams of `text` (the whole text when it is shorter)."""
+    words = _word_re.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "big") for g in grams}
+
+
+def minhash(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of `text`, or None if it has no words."""
+    hashed = shingles(text)
+    if not hashed:
+        return None
+    return tuple(
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashed)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """Signatures of the documents seen so far, bucketed by LSH band."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = DEDUP_BANDS):
+        self.threshold = threshold
+        self.bands = max(1, min(bands, DEDUP_PERMUTATIONS))
+        self.rows = DEDUP_PERMUTATIONS // self.bands
+        self._buckets: dict = {}
+        self._signatures: dict = {}
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def match(self, signature: Optional[Tuple[int, ...]]) -> Optional[Tuple[str, float]]:
+        """The most similar indexed document at or above the threshold, with its similarity."""
+        if signature is None:
+            return None
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for doc_id in candidates:
+            score = similarity(signature, self._signatures[doc_id])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (doc_id, score)
+        return best
+
+    def add(self, doc_id: str, signature: Optional[Tuple[int, ...]]):
+        if signature is None or doc_id in self._signatures:
+            return
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -0,0 +1,314 @@
+"""Per-run store for retrieved documents, referenced from graph state by id.
+
+The retrievers put every document they fetch into the run's `DocumentStore`
+and return compact references - id, source, title and a short snippet - as
+`context`, so checkpoints, streamed events and state copies no longer carry
+whole documents. Nodes that need the text resolve references back into
+documents.
+
+Documents are deduplicated by URL (new passages of an already stored URL are
+merged into it), by content hash and - with DEDUP_ENABLED - by MinHash
+near-duplicate detection (utils/dedup.py), so the same page fetched by
+several queries or analysts is paid for once. A store keeps up to DOC_STORE_MEMORY_BYTES
+of text in memory and spills the least recently used documents to files under
+DOC_STORE_DIR. All interviews of a run share one store; it is released when
+the run's interviews finish, and stores left idle for DOC_STORE_TTL_SECONDS are
+dropped.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Union
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+
+from MultiAgents_Workflow.agents.ResearchAgent.utils.context_packer import SourceDocument, count_tokens, parse_documents
+from MultiAgents_Workflow.agents.ResearchAgent.utils.dedup import DEDUP_ENABLED, NearDuplicateIndex, minhash
+
+load_dotenv()
+
+
+DOC_STORE_DIR = os.getenv("DOC_STORE_DIR", os.path.join(".cache", "documents"))
+DOC_STORE_MEMORY_BYTES = int(os.getenv("DOC_STORE_MEMORY_BYTES", str(2 * 1024 * 1024)))
+DOC_STORE_TTL_SECONDS = float(os.getenv("DOC_STORE_TTL_SECONDS", "3600"))
+DOC_SNIPPET_CHARS = int(os.getenv("DOC_SNIPPET_CHARS", "160"))
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in text.split("\n\n") if p.strip()]
+
+
+def make_ref(doc_id: str, doc: SourceDocument) -> dict:
+    """The state-side reference to a stored document."""
+    snippet = " ".join(doc.content.split())
+    if len(snippet) > DOC_SNIPPET_CHARS:
+        snippet = snippet[:DOC_SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+    return {"doc_id": doc_id, "source": doc.source, "title": doc.title, "snippet": snippet}
+
+
+def is_ref(entry) -> bool:
+    return isinstance(entry, dict) and "doc_id" in entry
+
+
+def context_ids(context: Iterable) -> set:
+    """Ids of the documents referenced in `context`."""
+    return {entry["doc_id"] for entry in context or () if is_ref(entry)}
+
+
+class DocumentStore:
+    """Documents of one run: deduplicated, in memory up to a byte budget, spilled to disk beyond it."""
+
+    def __init__(self, key: str, root: str = DOC_STORE_DIR, memory_bytes: int = DOC_STORE_MEMORY_BYTES):
+        self.key = key
+        self.spill_dir = os.path.join(root, _digest(key))
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._refs: dict[str, dict] = {}  # id -> the reference handed out for it
+        self._memory: "OrderedDict[str, str]" = OrderedDict()  # id -> content, least recently used first
+        self._in_memory = 0
+        self._spilled: set = set()
+        self._by_url: dict[str, str] = {}
+        self._by_content: dict[str, str] = {}
+        self._near = NearDuplicateIndex()
+        self.last_used = time.monotonic()
+        self.added = 0
+        self.url_duplicates = 0
+        self.content_duplicates = 0
+        self.near_duplicates = 0
+        self.context_duplicates = 0
+        self.tokens_removed = 0
+        self.bytes_referenced = 0
+        self.spills = 0
+
+    def _spill_path(self, doc_id: str) -> str:
+        return os.path.join(self.spill_dir, doc_id + ".txt")
+
+    def _load(self, doc_id: str) -> Optional[str]:
+        content = self._memory.get(doc_id)
+        if content is not None:
+            self._memory.move_to_end(doc_id)
+            return content
+        if doc_id in self._spilled:
+            with open(self._spill_path(doc_id), encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def _keep(self, doc_id: str, content: str):
+        old = self._memory.pop(doc_id, None)
+        if old is not None:
+            self._in_memory -= len(old)
+        self._spilled.discard(doc_id)
+        self._memory[doc_id] = content
+        self._in_memory += len(content)
+        while self._in_memory > self.memory_bytes and len(self._memory) > 1:
+            victim, text = self._memory.popitem(last=False)
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(victim), "w", encoding="utf-8") as f:
+                f.write(text)
+            self._in_memory -= len(text)
+            self._spilled.add(victim)
+            self.spills += 1
+
+    def _known(self, doc: SourceDocument, content_key: str) -> Optional[str]:
+        """Under the lock: the id of an exact or same-URL duplicate of `doc`, merging new passages of a URL."""
+        doc_id = self._by_content.get(content_key)
+        if doc_id is not None:
+            self.content_duplicates += 1
+            self.tokens_removed += count_tokens(doc.content)
+            return doc_id
+        doc_id = self._by_url.get(doc.source) if doc.source else None
+        if doc_id is not None:
+            # Same page, different excerpt (e.g. another query): add the passages not seen yet
+            self.url_duplicates += 1
+            stored = self._load(doc_id) or ""
+            known = set(_paragraphs(stored))
+            passages = _paragraphs(doc.content)
+            new = [p for p in passages if p not in known]
+            if new:
+                self._keep(doc_id, "\n\n".join([stored] + new) if stored else "\n\n".join(new))
+            self.tokens_removed += sum(count_tokens(p) for p in passages if p in known)
+            self._by_content[content_key] = doc_id
+            return doc_id
+        return None
+
+    def put(self, doc: SourceDocument) -> str:
+        """Store `doc` and return its id; a stored URL, identical or near-identical content keeps its id."""
+        content_key = _digest(" ".join(doc.content.split()))
+        with self._lock:
+            self.last_used = time.monotonic()
+            self.bytes_referenced += len(doc.content)
+            doc_id = self._known(doc, content_key)
+            if doc_id is not None:
+                return doc_id
+
+        # Signatures are the costly part; computed outside the lock
+        signature = minhash(doc.content) if DEDUP_ENABLED else None
+        with self._lock:
+            doc_id = self._known(doc, content_key)  # the same document may have arrived meanwhile
+            if doc_id is not None:
+                return doc_id
+            match = self._near.match(signature)
+            if match is not None:
+                doc_id = match[0]
+                self.near_duplicates += 1
+                self.tokens_removed += count_tokens(doc.content)
+            else:
+                doc_id = _digest(doc.source) if doc.source else content_key
+                self._refs[doc_id] = make_ref(doc_id, doc)
+                self._keep(doc_id, doc.content)
+                self._near.add(doc_id, signature)
+                self.added += 1
+            self._by_content[content_key] = doc_id
+            if doc.source:
+                self._by_url.setdefault(doc.source, doc_id)
+            return doc_id
+
+    def ref(self, doc_id: str, context_ids: set) -> Optional[dict]:
+        """Reference to hand out for `doc_id`, or None (counted) if `context_ids` already has it."""
+        with self._lock:
+            if doc_id in context_ids:
+                self.context_duplicates += 1
+                return None
+            return dict(self._refs[doc_id])
+
+    def get(self, doc_id: str) -> Optional[SourceDocument]:
+        with self._lock:
+            self.last_used = time.monotonic()
+            ref = self._refs.get(doc_id)
+            if ref is None:
+                return None
+            return SourceDocument(ref["source"], ref["title"], self._load(doc_id) or "")
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._in_memory = 0
+            self._spilled.clear()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._refs),
+                "memory_bytes": self._in_memory,
+                "spilled": len(self._spilled),
+            }
+
+
+class DocumentStores:
+    """The open per-run stores."""
+
+    def __init__(self, ttl_seconds: float = DOC_STORE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._stores: dict[str, DocumentStore] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.released = 0
+        self.expired = 0
+        # Totals of released stores, so /metrics keeps them after the runs end
+        self.totals = {"added": 0, "url_duplicates": 0, "content_duplicates": 0, "near_duplicates": 0,
+                       "context_duplicates": 0, "tokens_removed": 0, "bytes_referenced": 0, "spills": 0}
+
+    def _retire(self, store: DocumentStore):
+        for name in self.totals:
+            self.totals[name] += getattr(store, name)
+        removed = store.content_duplicates + store.near_duplicates + store.url_duplicates
+        print(f"[doc_store] {store.key}: {store.added} documents kept, {removed} duplicates collapsed "
+              f"({store.near_duplicates} near-identical), ~{store.tokens_removed} tokens removed", file=sys.stderr)
+        store.close()
+
+    def get(self, key: str, create: bool = True) -> Optional[DocumentStore]:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, s in self._stores.items() if k != key and now - s.last_used > self.ttl_seconds]
+            retired = [self._stores.pop(k) for k in expired]
+            self.expired += len(retired)
+            store = self._stores.get(key)
+            if store is None and create:
+                store = self._stores[key] = DocumentStore(key)
+                self.opened += 1
+        for old in retired:
+            print(f"[doc_store] Dropping idle document store of {old.key}", file=sys.stderr)
+            self._retire(old)
+        return store
+
+    def release(self, key: str):
+        with self._lock:
+            store = self._stores.pop(key, None)
+            if store is not None:
+                self.released += 1
+        if store is not None:
+            self._retire(store)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stores = list(self._stores.values())
+            totals = dict(self.totals)
+        for store in stores:
+            for name in totals:
+                totals[name] += getattr(store, name)
+        open_stats = [s.stats() for s in stores]
+        return {
+            "open": len(stores),
+            "opened": self.opened,
+            "released": self.released,
+            "expired": self.expired,
+            "documents": sum(s["documents"] for s in open_stats),
+            "memory_bytes": sum(s["memory_bytes"] for s in open_stats),
+            "spilled": sum(s["spilled"] for s in open_stats),
+            **totals,
+        }
+
+
+doc_stores = DocumentStores()
+
+
+def store_key(config: Optional[RunnableConfig]) -> str:
+    """The run a node belongs to: `doc_store` in its configurable, else its thread id."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("doc_store") or configurable.get("thread_id") or "default"
+
+
+def store_documents(formatted: str, config: Optional[RunnableConfig], seen: set) -> List[dict]:
+    """Put formatted retriever output into the run's store; returns the references to add to `context`.
+
+    `seen` holds the ids already referenced (see `context_ids`) and gains the new ones, so a caller
+    storing several results keeps one set: documents that collapse onto one in it add nothing.
+    """
+    store = doc_stores.get(store_key(config))
+    refs = []
+    for doc in parse_documents([formatted]):
+        doc_id = store.put(doc)
+        ref = store.ref(doc_id, seen)
+        if ref is not None:
+            seen.add(doc_id)
+            refs.append(ref)
+    return refs
+
+
+def resolve_context(context: Iterable, config: Optional[RunnableConfig]) -> List[Union[SourceDocument, str]]:
+    """Documents behind the references in `context`, each once; plain strings pass through.
+
+    A reference whose store is gone (e.g. after a restart) resolves to its snippet.
+    """
+    store = doc_stores.get(store_key(config), create=False)
+    resolved, seen = [], set()
+    for entry in context or []:
+        if not is_ref(entry):
+            resolved.append(entry)
+            continue
+        if entry["doc_id"] in seen:
+            continue
+        seen.add(entry["doc_id"])
+        doc = store.get(entry["doc_id"]) if store is not None else None
+        resolved.append(doc or SourceDocument(entry.get("source", ""), entry.get("title", ""), entry.get("snippet", "")))
+    return resolved
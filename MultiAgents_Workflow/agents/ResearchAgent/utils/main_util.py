@@ -2,7 +2,8 @@
 from langgraph.constants import Send
 from langchain_core.messages import HumanMessage
 from MultiAgents_Workflow.agents.ResearchAgent.prompt.report_writer import report_writer_instructions
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from MultiAgents_Workflow.agents.ResearchAgent.utils.stream_writer import stream_completion
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage
 from MultiAgents_Workflow.agents.ResearchAgent.prompt.intro_conclusion import intro_conclusion_instructions
 import sys
@@ -24,7 +25,7 @@ def initialize_all_interview_states(state:ResearchGraphState):
     }
 
 
-def write_report(state: ResearchGraphState):
+async def write_report(state: ResearchGraphState, config: RunnableConfig):
     # Full set of sections
     sections = state["sections"]
     topic = state["topic"]
@@ -44,15 +45,16 @@ def write_report(state: ResearchGraphState):
     # Summarize the sections into a final report
     system_message = report_writer_instructions.format(topic=topic, context=formatted_str_sections)
     print(f"[write_report] Sending to OpenAI...", file=sys.stderr)
-    report = chat.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")])
+    report = await stream_completion([SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")],
+                                     part="report", key=topic, config=config)
 
-    content = report.content if report else "ERROR: No response from OpenAI"
+    content = report or "ERROR: No response from OpenAI"
     print(f"[write_report] Generated content length: {len(content)}", file=sys.stderr)
     print(f"[write_report] Content preview: {content[:200]}...", file=sys.stderr)
 
     return {"content": content}
 
-def write_introduction(state: ResearchGraphState):
+async def write_introduction(state: ResearchGraphState, config: RunnableConfig):
     # Full set of sections
     sections = state["sections"]
     topic = state["topic"]
@@ -69,15 +71,16 @@ def write_introduction(state: ResearchGraphState):
 
     print(f"[write_introduction] Sending to OpenAI...", file=sys.stderr)
     instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)
-    intro = chat.invoke([instructions]+[HumanMessage(content=f"Write the report introduction")])
+    intro = await stream_completion([instructions]+[HumanMessage(content=f"Write the report introduction")],
+                                    part="introduction", key=topic, config=config)
 
-    introduction = intro.content if intro else "ERROR: No response from OpenAI"
+    introduction = intro or "ERROR: No response from OpenAI"
     print(f"[write_introduction] Generated introduction length: {len(introduction)}", file=sys.stderr)
     print(f"[write_introduction] Introduction preview: {introduction[:200]}...", file=sys.stderr)
 
     return {"introduction": introduction}
 
-def write_conclusion(state: ResearchGraphState):
+async def write_conclusion(state: ResearchGraphState, config: RunnableConfig):
     # Full set of sections
     sections = state["sections"]
     topic = state["topic"]
@@ -94,9 +97,10 @@ def write_conclusion(state: ResearchGraphState):
 
     print(f"[write_conclusion] Sending to OpenAI...", file=sys.stderr)
     instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)
-    conclusion = chat.invoke([instructions]+[HumanMessage(content=f"Write the report conclusion")])
+    conclusion = await stream_completion([instructions]+[HumanMessage(content=f"Write the report conclusion")],
+                                         part="conclusion", key=topic, config=config)
 
-    conclusion_text = conclusion.content if conclusion else "ERROR: No response from OpenAI"
+    conclusion_text = conclusion or "ERROR: No response from OpenAI"
     print(f"[write_conclusion] Generated conclusion length: {len(conclusion_text)}", file=sys.stderr)
     print(f"[write_conclusion] Conclusion preview: {conclusion_text[:200]}...", file=sys.stderr)
 
@@ -1,19 +1,21 @@
 ﻿from typing import Literal
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain.output_parsers import PydanticOutputParser
 from langgraph.types import Command, interrupt
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.analyst_schema import GenerateAnalystState,Perspectives
 from MultiAgents_Workflow.agents.ResearchAgent.prompt.analyst_instructions import analyst_instructions
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import get_chat
 import sys
 
 
 
-def create_analyst_personas(state: GenerateAnalystState):
+async def create_analyst_personas(state: GenerateAnalystState, config: RunnableConfig):
     """Create analyst personas based on the research topic and feedback.
     
     Args:
         state (GenerateAnalystState): The state object containing the research topic and feedback.
+        config (RunnableConfig): The run config; selects the model profile for this node.
         
     Returns:
         dict: Updated state with analyst personas.
@@ -28,7 +30,7 @@ def create_analyst_personas(state: GenerateAnalystState):
         human_analyst_feedback=human_analyst_feedback
     )
 
-    analysts = chat.invoke([SystemMessage(content=system_message)] + [HumanMessage(content="Generate the set of analysts")])
+    analysts = await get_chat(config).ainvoke([SystemMessage(content=system_message)] + [HumanMessage(content="Generate the set of analysts")])
     parsed_analysts = PydanticOutputParser(pydantic_object=Perspectives).parse(analysts.content)
 
     # Convert Pydantic models to TypedDict format for main graph state
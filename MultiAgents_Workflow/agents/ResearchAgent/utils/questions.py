@@ -1,12 +1,13 @@
 ﻿from MultiAgents_Workflow.agents.ResearchAgent.schemas.research_schema import ResearchState
 from MultiAgents_Workflow.agents.ResearchAgent.prompt.question_instructions import FULL_PROMPT
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import get_chat
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
 
 
 
 
-def generate_questions(state: ResearchState):
+async def generate_questions(state: ResearchState, config: RunnableConfig):
     """ Node to generate a question """
 
     # Get state
@@ -15,7 +16,7 @@ def generate_questions(state: ResearchState):
 
     # Generate question
     system_message = FULL_PROMPT.format(goals=analyst['persona'])
-    question = chat.invoke([SystemMessage(content=system_message)]+messages)
+    question = await get_chat(config).ainvoke([SystemMessage(content=system_message)]+messages)
 
     # Write messages to state
     return {"messages": [question]}
\ No newline at end of file
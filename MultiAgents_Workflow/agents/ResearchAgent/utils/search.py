@@ -1,11 +1,18 @@
 from langchain_tavily import TavilySearch
 from langchain_community.document_loaders import WikipediaLoader
 from typing import Any, Dict, List, Optional, Union
+import asyncio
+import os
 import re
+import sys
 import json
 from pydantic import BaseModel,Field
-from MultiAgents_Workflow.agents.ResearchAgent.prompt.search_instructions import search_instructions
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from langchain_core.runnables import RunnableConfig
+from MultiAgents_Workflow.agents.ResearchAgent.prompt.search_instructions import search_instructions, multi_query_addendum
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import get_chat
+from MultiAgents_Workflow.agents.ResearchAgent.utils.search_cache import search_cache
+from MultiAgents_Workflow.agents.ResearchAgent.utils.doc_store import context_ids, store_documents
+from MultiAgents_Workflow.agents.ResearchAgent.utils.wiki_index import get_offline_index, format_passages
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -86,70 +93,130 @@ def _format_tavily_results(search_docs: Union[str, List[Any]]) -> str:
     return "\n\n---\n\n".join(formatted_chunks)
 
 
-# ---- Fixed web search ----
-def search_web(state: Any) -> Dict[str, List[str]]:
-    """Retrieve docs from web search (Tavily) with robust parsing and formatting."""
-    tavily_search = TavilySearch(max_results=5)  # reads TAVILY_API_KEY from env
+# ---- Query planning (shared by both retrievers) ----
+SEARCH_MAX_SUBQUERIES = int(os.getenv("SEARCH_MAX_SUBQUERIES", "1"))
 
-    raw_response = chat.invoke([search_instructions] + state["messages"])
 
-    if not getattr(raw_response, "content", ""):
-        return {"context": [state.get("topic", "No topic found")]}
+def _planner_prompt(max_queries: int) -> str:
+    if max_queries <= 1:
+        return search_instructions
+    return search_instructions + multi_query_addendum.format(max_queries=max_queries)
 
-    # 1) Try strict Pydantic first
-    try:
-        # Attempt to parse raw JSON (after stripping fences) into our model
-        obj = _extract_json_object(raw_response.content)
-        if obj is None:
-            raise ValueError("No JSON object found in model output.")
-        parsed = SearchQuery(**obj)
-        search_q = (parsed.search_query or "").strip()
-        if not search_q:
-            raise ValueError("Empty search_query.")
-
-        # 2) Call Tavily
-        search_docs = tavily_search.invoke(search_q)
-
-        # 3) Format safely
-        formatted_search_docs = _format_tavily_results(search_docs)
-        return {"context": [formatted_search_docs]}
 
-    except Exception as e:
-        print(f"Error while parsing or fetching docs: {e}")
-        return handle_parsing_error(raw_response, default_message=state.get("topic", "No topic found"))
+def _parse_search_queries(content: str, max_queries: int) -> List[str]:
+    """Pull `search_queries` (list) or `search_query` (str) out of the planner reply."""
+    obj = _extract_json_object(content)
+    if obj is None:
+        raise ValueError("No JSON object found in model output.")
+    candidates = obj.get("search_queries")
+    if not isinstance(candidates, list):
+        candidates = [SearchQuery(**obj).search_query]
+    queries: List[str] = []
+    for q in candidates:
+        q = (q or "").strip() if isinstance(q, str) else ""
+        if q and q not in queries:
+            queries.append(q)
+    if not queries:
+        raise ValueError("Empty search_query.")
+    return queries[:max(1, max_queries)]
 
 
-# ---- Fixed Wikipedia search ----
-def search_wikipedia(state: Any) -> Dict[str, List[str]]:
-    """Retrieve docs from Wikipedia with robust parsing and formatting."""
-    raw_response = chat.invoke([search_instructions] + state["messages"])
+async def plan_search_queries(state: Any, config: RunnableConfig) -> Dict[str, Any]:
+    """Turn the analyst's latest question into search queries, once per turn.
+
+    Both retrieval branches read `search_queries` from state, so the query
+    prompt is sent to the model a single time per interview turn.
+    """
+    raw_response = await get_chat(config).ainvoke([_planner_prompt(SEARCH_MAX_SUBQUERIES)] + state["messages"])
 
     if not getattr(raw_response, "content", ""):
-        return {"context": [state.get("topic", "No topic found")]}
+        return {"search_queries": [], "context": [state.get("topic", "No topic found")]}
 
     try:
-        obj = _extract_json_object(raw_response.content)
-        if obj is None:
-            raise ValueError("No JSON object found in model output.")
-        parsed = SearchQuery(**obj)
-        search_q = (parsed.search_query or "").strip()
-        if not search_q:
-            raise ValueError("Empty search_query.")
-
-        search_docs = WikipediaLoader(query=search_q, load_max_docs=5).load()
-
-        formatted_search_docs = "\n\n---\n\n".join(
-            [
-                f'<Document source="{getattr(doc, "metadata", {}).get("source", "")}" '
-                f'title="{getattr(doc, "metadata", {}).get("title", "")}"/>\n'
-                f'{getattr(doc, "page_content", str(doc))}\n</Document>'
-                for doc in search_docs
-            ]
-        )
-
-        return {"context": [formatted_search_docs]}
-
+        queries = _parse_search_queries(raw_response.content, SEARCH_MAX_SUBQUERIES)
+        print(f"[plan_search_queries] {queries}", file=sys.stderr)
+        return {"search_queries": queries}
     except Exception as e:
-        print(f"Error while parsing or fetching docs: {e}")
-        return handle_parsing_error(raw_response, default_message=state.get("topic", "No topic found"))
+        print(f"Error while parsing search queries: {e}")
+        fallback = handle_parsing_error(raw_response, default_message=state.get("topic", "No topic found"))
+        return {"search_queries": [], **fallback}
+
+
+# ---- Fixed web search ----
+async def _cached(provider: str, search_q: str, loader) -> str:
+    if search_cache is None:
+        return await loader(search_q)
+    return await search_cache.fetch(provider, search_q, loader)
 
+
+async def _fetch_tavily(tavily_search: TavilySearch, search_q: str) -> str:
+    async def _load(q: str) -> str:
+        search_docs = await tavily_search.ainvoke(q)
+        return _format_tavily_results(search_docs)
+    return await _cached("tavily", search_q, _load)
+
+
+async def search_web(state: Any, config: RunnableConfig) -> Dict[str, List[Any]]:
+    """Retrieve docs from web search (Tavily) for every planned query, concurrently.
+
+    The documents go to the run's document store; `context` gets references to them.
+    """
+    queries = state.get("search_queries") or []
+    if not queries:
+        return {"context": []}
+
+    tavily_search = TavilySearch(max_results=5)  # reads TAVILY_API_KEY from env
+    results = await asyncio.gather(*[_fetch_tavily(tavily_search, q) for q in queries], return_exceptions=True)
+
+    context: List[Any] = []
+    seen = context_ids(state.get("context"))  # shared by all queries' results
+    for search_q, result in zip(queries, results):
+        if isinstance(result, Exception):
+            print(f"Error while fetching web docs for '{search_q}': {result}")
+        elif result:
+            context.extend(await asyncio.to_thread(store_documents, result, config, seen))
+    return {"context": context}
+
+
+# ---- Fixed Wikipedia search ----
+def _format_wikipedia_docs(search_docs: List[Any]) -> str:
+    return "\n\n---\n\n".join(
+        [
+            f'<Document source="{getattr(doc, "metadata", {}).get("source", "")}" '
+            f'title="{getattr(doc, "metadata", {}).get("title", "")}"/>\n'
+            f'{getattr(doc, "page_content", str(doc))}\n</Document>'
+            for doc in search_docs
+        ]
+    )
+
+
+async def _fetch_wikipedia(search_q: str) -> str:
+    # Local FTS index (WIKIPEDIA_INDEX_PATH): no network, no cache needed; opening and querying it block
+    offline_index = await asyncio.to_thread(get_offline_index)
+    if offline_index is not None:
+        passages = await asyncio.to_thread(offline_index.search, search_q, k=5)
+        return format_passages(passages)
+
+    async def _load(q: str) -> str:
+        # WikipediaLoader has no native async path; keep its page fetches off the event loop
+        search_docs = await asyncio.to_thread(WikipediaLoader(query=q, load_max_docs=5).load)
+        return _format_wikipedia_docs(search_docs)
+    return await _cached("wikipedia", search_q, _load)
+
+
+async def search_wikipedia(state: Any, config: RunnableConfig) -> Dict[str, List[Any]]:
+    """Retrieve docs from Wikipedia for every planned query, concurrently; stored like `search_web`'s."""
+    queries = state.get("search_queries") or []
+    if not queries:
+        return {"context": []}
+
+    results = await asyncio.gather(*[_fetch_wikipedia(q) for q in queries], return_exceptions=True)
+
+    context: List[Any] = []
+    seen = context_ids(state.get("context"))  # shared by all queries' results
+    for search_q, result in zip(queries, results):
+        if isinstance(result, Exception):
+            print(f"Error while fetching Wikipedia docs for '{search_q}': {result}")
+        elif result:
+            context.extend(await asyncio.to_thread(store_documents, result, config, seen))
+    return {"context": context}
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from MultiAgents_Workflow.agents.ResearchAgent.utils.sqlite_store import SQLiteStore
+
+load_dotenv()
+
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_cache.sqlite"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "20000"))
+# How long a result counts as fresh, per provider
+SEARCH_CACHE_TTL_SECONDS: Dict[str, float] = {
+    "tavily": float(os.getenv("SEARCH_CACHE_TTL_TAVILY", str(6 * 3600))),
+    "wikipedia": float(os.getenv("SEARCH_CACHE_TTL_WIKIPEDIA", str(7 * 24 * 3600))),
+}
+# Extra window during which a stale result is still served while it is refreshed
+SEARCH_CACHE_STALE_SECONDS = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", str(24 * 3600)))
+
+_punct_re = re.compile(r"[^\w\s]+")
+_space_re = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, width- and punctuation-insensitive form of a search query."""
+    q = unicodedata.normalize("NFKC", query or "").lower()
+    q = _punct_re.sub(" ", q)
+    return _space_re.sub(" ", q).strip()
+
+
+class SearchResultCache:
+    """Retrieval cache keyed on (provider, normalized query).
+
+    Formatted `<Document ...>` blocks are stored in SQLite. A result is fresh for
+    the provider TTL; after that it is served stale for `stale_seconds` while a
+    background task refetches it. The provider latency recorded at fetch time is
+    credited as "saved" on every hit.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+                 ttl_seconds: Optional[Dict[str, float]] = None, stale_seconds: float = SEARCH_CACHE_STALE_SECONDS):
+        self._store = SQLiteStore(path, table="search_results", max_entries=max_entries)
+        self.ttl_seconds = dict(ttl_seconds or SEARCH_CACHE_TTL_SECONDS)
+        self.stale_seconds = stale_seconds
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "latency_saved_s": 0.0}
+
+    def _bump(self, name: str, amount: float = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    async def fetch(self, provider: str, query: str, loader: Callable[[str], Awaitable[str]]) -> str:
+        """Return the cached result for `query`, calling `loader(query)` on a miss."""
+        key = normalize_query(query)
+        entry = await asyncio.to_thread(self._store.get, provider, key)
+        if entry is not None:
+            meta = json.loads(entry.meta or "{}")
+            self._bump("latency_saved_s", meta.get("latency_s", 0.0))
+            value = entry.value.decode("utf-8")
+            if time.time() < meta.get("fresh_until", 0):
+                self._bump("hits")
+            else:
+                self._bump("stale_hits")
+                self._schedule_refresh(provider, key, query, loader)
+            return value
+
+        self._bump("misses")
+        return await self._load(provider, key, query, loader)
+
+    async def _load(self, provider: str, key: str, query: str, loader: Callable[[str], Awaitable[str]]) -> str:
+        started = time.perf_counter()
+        value = await loader(query)
+        latency = time.perf_counter() - started
+        if value:
+            ttl = self.ttl_seconds.get(provider, 3600.0)
+            meta = json.dumps({"fresh_until": time.time() + ttl, "latency_s": round(latency, 4), "query": query})
+            await asyncio.to_thread(
+                self._store.set, provider, key, value.encode("utf-8"), ttl + self.stale_seconds, meta
+            )
+        return value
+
+    def _schedule_refresh(self, provider: str, key: str, query: str, loader: Callable[[str], Awaitable[str]]):
+        if (provider, key) in self._refreshing:
+            return
+        self._refreshing.add((provider, key))
+
+        async def _refresh():
+            try:
+                await self._load(provider, key, query, loader)
+                self._bump("refreshes")
+            except Exception as e:
+                print(f"[search_cache] Background refresh failed for {provider}:{key}: {e}", file=sys.stderr)
+            finally:
+                self._refreshing.discard((provider, key))
+
+        task = asyncio.create_task(_refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def clear(self, provider: Optional[str] = None) -> int:
+        return self._store.clear(provider)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["latency_saved_s"] = round(stats["latency_saved_s"], 3)
+        stats["entries"] = self._store.count()
+        return stats
+
+
+# Shared instance; SEARCH_CACHE_ENABLED=false bypasses it
+search_cache = SearchResultCache() if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no") else None
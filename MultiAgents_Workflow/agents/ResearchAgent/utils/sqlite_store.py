@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StoreEntry:
+    value: bytes
+    created_at: float
+    expires_at: Optional[float]
+    meta: Optional[str]
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.time()
+
+
+class SQLiteStore:
+    """Small namespaced key/value store on SQLite with TTL and LRU eviction.
+
+    Shared by the on-disk caches of the research agent. Every entry records its
+    last access time; once the table grows past `max_entries` the least recently
+    used rows are evicted. Expired rows are never returned and are dropped on the
+    next eviction pass.
+    """
+
+    EVICT_EVERY = 64  # writes between eviction passes
+
+    def __init__(self, path: str, table: str = "entries", max_entries: int = 10_000):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                meta TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_accessed ON {table} (accessed_at)")
+
+    def get(self, namespace: str, key: str) -> Optional[StoreEntry]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at, expires_at, meta FROM {self.table} WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = StoreEntry(value=row[0], created_at=row[1], expires_at=row[2], meta=row[3])
+            if entry.expired:
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+        return entry
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None, meta: Optional[str] = None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                f"(namespace, key, value, meta, created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, value, meta, now, expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict_locked()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """Drop every entry, or only the entries of one namespace. Returns rows removed."""
+        with self._lock:
+            if namespace is None:
+                cur = self._conn.execute(f"DELETE FROM {self.table}")
+            else:
+                cur = self._conn.execute(f"DELETE FROM {self.table} WHERE namespace = ?", (namespace,))
+            return cur.rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            return cur.rowcount
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def _evict_locked(self):
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        total = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"(SELECT rowid FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
@@ -0,0 +1,72 @@
+import os
+import sys
+from typing import Any
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import get_chat
+
+load_dotenv()
+
+
+# Deltas are coalesced to at least this many characters (or a line break) per custom event
+WRITER_STREAM_MIN_CHARS = int(os.getenv("WRITER_STREAM_MIN_CHARS", "24"))
+WRITER_DELTA_EVENT = "writer_delta"
+
+
+class _DeltaPublisher(AsyncCallbackHandler):
+    """Re-publishes a chat model's tokens as `writer_delta` custom events on the node's run."""
+
+    def __init__(self, part: str, key: str, config: RunnableConfig | None):
+        self.part = part
+        self.key = key
+        self.config = config
+        self.index = 0
+        self.sent_chars = 0
+        self.pending = ""
+        self.enabled = True
+
+    async def publish(self, text: str):
+        if not self.enabled or not text:
+            return
+        try:
+            await adispatch_custom_event(
+                WRITER_DELTA_EVENT,
+                {"part": self.part, "key": self.key, "index": self.index, "delta": text},
+                config=self.config,
+            )
+            self.index += 1
+            self.sent_chars += len(text)
+        except RuntimeError as e:
+            # Not running inside a graph run: there is no stream to publish to
+            print(f"[stream_completion] Not streaming {self.part} deltas: {e}", file=sys.stderr)
+            self.enabled = False
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.pending += token
+        if len(self.pending) >= WRITER_STREAM_MIN_CHARS or "\n" in token:
+            text, self.pending = self.pending, ""
+            await self.publish(text)
+
+
+async def stream_completion(messages, part: str, key: str, config: RunnableConfig | None = None) -> str:
+    """
+    Run a chat completion while publishing its text as `writer_delta` custom events.
+
+    `part` is what is being written (section, report, introduction, conclusion) and `key`
+    tells parallel writers apart. Tokens stream whenever the caller streams the graph;
+    a cached or non-streamed completion is published in one delta. Returns the full text.
+    """
+    publisher = _DeltaPublisher(part, key, config)
+    # ainvoke rather than astream so the LLM response cache still applies
+    response = await get_chat(config).ainvoke(messages, merge_configs(config, {"callbacks": [publisher]}))
+    content = response.content if response else ""
+
+    await publisher.publish(publisher.pending)
+    if publisher.sent_chars == 0:
+        await publisher.publish(content)
+    return content
@@ -0,0 +1,233 @@
+"""Offline Wikipedia backend: SQLite FTS5 index over a dump (or a subset of one).
+
+Build an index once:
+
+    python -m MultiAgents_Workflow.agents.ResearchAgent.utils.wiki_index import enwiki-pages-articles.xml.bz2 --index .cache/wikipedia.sqlite
+
+then set WIKIPEDIA_INDEX_PATH to that file and `search_wikipedia` reads passages
+from it instead of calling the Wikipedia API. JSON-lines input with `title`,
+`text` and optional `url` fields is accepted as well, which is handy for small
+deterministic fixtures.
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional
+
+WIKIPEDIA_INDEX_PATH = os.getenv("WIKIPEDIA_INDEX_PATH", "")
+WIKIPEDIA_BASE_URL = os.getenv("WIKIPEDIA_BASE_URL", "https://en.wikipedia.org/wiki/")
+PASSAGE_WORDS = 200
+
+_template_re = re.compile(r"\{\{[^{}]*\}\}")
+_ref_re = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL)
+_tag_re = re.compile(r"<[^>]+>")
+_file_link_re = re.compile(r"\[\[(?:File|Image|Category):[^\]]*\]\]", re.IGNORECASE)
+_link_re = re.compile(r"\[\[(?:[^\]|]*\|)?([^\]]*)\]\]")
+_ext_link_re = re.compile(r"\[https?://\S+\s*([^\]]*)\]")
+_heading_re = re.compile(r"^=+\s*(.*?)\s*=+\s*$", re.MULTILINE)
+_emphasis_re = re.compile(r"'{2,}")
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+
+def clean_wikitext(text: str) -> str:
+    """Reduce raw wikitext to readable prose (good enough for retrieval, not rendering)."""
+    text = _ref_re.sub("", text or "")
+    # Templates nest; strip innermost first until none are left
+    previous = None
+    while previous != text:
+        previous, text = text, _template_re.sub("", text)
+    text = _file_link_re.sub("", text)
+    text = _link_re.sub(r"\1", text)
+    text = _ext_link_re.sub(r"\1", text)
+    text = _heading_re.sub(r"\1", text)
+    text = _emphasis_re.sub("", text)
+    text = _tag_re.sub("", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def split_passages(text: str, passage_words: int = PASSAGE_WORDS) -> List[str]:
+    """Pack paragraphs into passages of roughly `passage_words` words."""
+    passages, buf, size = [], [], 0
+    for para in (p.strip() for p in text.split("\n\n")):
+        if not para:
+            continue
+        words = len(para.split())
+        if buf and size + words > passage_words:
+            passages.append("\n\n".join(buf))
+            buf, size = [], 0
+        buf.append(para)
+        size += words
+    if buf:
+        passages.append("\n\n".join(buf))
+    return passages
+
+
+def _open(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _iter_xml_pages(path: str) -> Iterator[Dict[str, str]]:
+    """Stream main-namespace, non-redirect pages out of a MediaWiki XML dump."""
+    with _open(path) as fh:
+        title, ns, text, redirect = None, None, None, False
+        for event, elem in ET.iterparse(fh, events=("end",)):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "title":
+                title = elem.text
+            elif tag == "ns":
+                ns = elem.text
+            elif tag == "redirect":
+                redirect = True
+            elif tag == "text":
+                text = elem.text
+            elif tag == "page":
+                if title and ns == "0" and not redirect and text:
+                    yield {
+                        "title": title,
+                        "text": clean_wikitext(text),
+                        "url": WIKIPEDIA_BASE_URL + title.replace(" ", "_"),
+                    }
+                title, ns, text, redirect = None, None, None, False
+                elem.clear()
+
+
+def _iter_jsonl_pages(path: str) -> Iterator[Dict[str, str]]:
+    with _open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            title = obj.get("title") or ""
+            yield {
+                "title": title,
+                "text": obj.get("text") or "",
+                "url": obj.get("url") or WIKIPEDIA_BASE_URL + title.replace(" ", "_"),
+            }
+
+
+class WikipediaIndex:
+    """Full-text passage index backed by SQLite FTS5 (BM25 ranking)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS passages "
+            "USING fts5(title, body, source UNINDEXED, tokenize='porter unicode61')"
+        )
+
+    def ingest(self, dump_path: str, max_pages: Optional[int] = None,
+               passage_words: int = PASSAGE_WORDS, batch_size: int = 500) -> int:
+        """Load pages from an XML dump or a JSON-lines file. Returns the number of pages indexed."""
+        is_xml = ".xml" in os.path.basename(dump_path)
+        pages = _iter_xml_pages(dump_path) if is_xml else _iter_jsonl_pages(dump_path)
+
+        indexed, rows = 0, []
+        started = time.perf_counter()
+        for page in pages:
+            for passage in split_passages(page["text"], passage_words):
+                rows.append((page["title"], passage, page["url"]))
+            indexed += 1
+            if len(rows) >= batch_size:
+                self._insert(rows)
+                rows = []
+            if max_pages and indexed >= max_pages:
+                break
+        if rows:
+            self._insert(rows)
+        with self._lock:
+            self._conn.execute("INSERT INTO passages(passages) VALUES ('optimize')")
+            self._conn.commit()
+        print(f"[wiki_index] Indexed {indexed} pages in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        return indexed
+
+    def _insert(self, rows):
+        with self._lock:
+            self._conn.executemany("INSERT INTO passages (title, body, source) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, str]]:
+        """Top-k passages for `query`; every query term is optional, BM25 decides the order."""
+        terms = list(dict.fromkeys(t.lower() for t in _token_re.findall(query or "")))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, body, source FROM passages WHERE passages MATCH ? ORDER BY bm25(passages, 5.0, 1.0) LIMIT ?",
+                (match, k),
+            ).fetchall()
+        return [{"title": r[0], "content": r[1], "source": r[2]} for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+
+
+def format_passages(passages: List[Dict[str, str]]) -> str:
+    """Same `<Document source=... title=...>` layout the live Wikipedia retriever produces."""
+    return "\n\n---\n\n".join(
+        f'<Document source="{p["source"]}" title="{p["title"]}"/>\n{p["content"]}\n</Document>'
+        for p in passages
+    )
+
+
+_index: Optional[WikipediaIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_offline_index() -> Optional[WikipediaIndex]:
+    """The configured offline index, or None when WIKIPEDIA_INDEX_PATH is unset or missing."""
+    global _index
+    if _index is None and WIKIPEDIA_INDEX_PATH and os.path.exists(WIKIPEDIA_INDEX_PATH):
+        with _index_lock:  # searches call this from worker threads
+            if _index is None:
+                _index = WikipediaIndex(WIKIPEDIA_INDEX_PATH)
+    return _index
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline Wikipedia index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="ingest a MediaWiki XML dump (.xml/.xml.bz2) or JSON-lines file")
+    imp.add_argument("dump")
+    imp.add_argument("--index", default=WIKIPEDIA_INDEX_PATH or os.path.join(".cache", "wikipedia.sqlite"))
+    imp.add_argument("--max-pages", type=int, default=None)
+    imp.add_argument("--passage-words", type=int, default=PASSAGE_WORDS)
+
+    q = sub.add_parser("search", help="print the top passages for a query")
+    q.add_argument("query")
+    q.add_argument("--index", default=WIKIPEDIA_INDEX_PATH or os.path.join(".cache", "wikipedia.sqlite"))
+    q.add_argument("-k", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    index = WikipediaIndex(args.index)
+    if args.command == "import":
+        index.ingest(args.dump, max_pages=args.max_pages, passage_words=args.passage_words)
+        print(f"{index.count()} passages in {args.index}")
+    else:
+        started = time.perf_counter()
+        passages = index.search(args.query, k=args.k)
+        print(format_passages(passages))
+        print(f"\n{len(passages)} passages in {(time.perf_counter() - started) * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main()
@@ -1,35 +1,44 @@
 ﻿from MultiAgents_Workflow.agents.ResearchAgent.prompt.section_writer import section_writer_instructions
-from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import chat
+from MultiAgents_Workflow.agents.ResearchAgent.utils.stream_writer import stream_completion
+from MultiAgents_Workflow.agents.ResearchAgent.utils.context_packer import SECTION_CONTEXT_TOKENS, packed_context
+from MultiAgents_Workflow.agents.ResearchAgent.utils.doc_store import resolve_context
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage
 from langchain_core.messages import HumanMessage
 from MultiAgents_Workflow.agents.ResearchAgent.schemas.research_schema import ResearchState
+import asyncio
 import sys
 
 
 
 
-def write_section(state:ResearchState):
+async def write_section(state:ResearchState, config: RunnableConfig):
     """
     Write a section of a report based on the source documents.
     """
 
     interview = state['interview']
     analyst = state['analyst']
-    context = state['context']
+    # State holds document references; the documents themselves are in the run's document store
+    context = await asyncio.to_thread(resolve_context, state['context'], config)
 
     print(f"[write_section] Analyst: {analyst['name']}", file=sys.stderr)
     print(f"[write_section] Interview length: {len(interview) if interview else 0}", file=sys.stderr)
-    print(f"[write_section] Context length: {len(str(context)) if context else 0}", file=sys.stderr)
+    print(f"[write_section] Context documents: {len(context)}", file=sys.stderr)
 
-    if not context or len(str(context)) == 0:
+    if not context:
         print(f"[write_section] ERROR: No context available for writing section", file=sys.stderr)
         return {'sections': [f"ERROR: No context available for {analyst['name']}"]}
 
     system_message = section_writer_instructions.format(focus = analyst['persona'])
+    # Ranked against the analyst's focus and packed under the section budget
+    context = await asyncio.to_thread(packed_context, context, analyst['persona'], SECTION_CONTEXT_TOKENS,
+                                      label=f"section:{analyst['name']}")
     print(f"[write_section] Sending to OpenAI...", file=sys.stderr)
-    section = chat.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")])
+    section = await stream_completion([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")],
+                                      part="section", key=analyst['name'], config=config)
 
-    section_content = section.content if section else f"ERROR: No response from OpenAI for {analyst['name']}"
+    section_content = section or f"ERROR: No response from OpenAI for {analyst['name']}"
     print(f"[write_section] Generated section length: {len(section_content)}", file=sys.stderr)
     print(f"[write_section] Section preview: {section_content[:200]}...", file=sys.stderr)
 
@@ -0,0 +1,79 @@
+"""Process-wide registry of compiled LangGraph graphs.
+
+Each graph module registers a factory for its graph; the registry compiles it
+once, keeps the compiled graph and records how long the compile took. Runs are
+isolated by their thread config, never by recompiling. Asking for a graph whose
+module has not been imported yet imports it from GRAPH_MODULES.
+"""
+import importlib
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from langgraph.graph.state import CompiledStateGraph
+
+
+# Module that registers each graph on import
+GRAPH_MODULES = {
+    "research": "MultiAgents_Workflow.agents.ResearchAgent.graph.graph_main",
+    "interview": "MultiAgents_Workflow.agents.ResearchAgent.graph.serach_ask_answer",
+    "analyst": "MultiAgents_Workflow.agents.ResearchAgent.graph.analyst_graph",
+    "writer": "MultiAgents_Workflow.agents.ReportAgent.graph.graph",
+}
+
+
+class GraphRegistry:
+    """Compile-once cache of named graphs."""
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], CompiledStateGraph]] = {}
+        self._graphs: dict[str, CompiledStateGraph] = {}
+        self._compile_seconds: dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.lookups = 0
+
+    def register(self, name: str, factory: Callable[[], CompiledStateGraph]):
+        """Register a graph factory; the first registration of a name wins."""
+        with self._lock:
+            self._factories.setdefault(name, factory)
+
+    def get(self, name: str) -> CompiledStateGraph:
+        """Return the compiled graph, compiling it on first use."""
+        self.lookups += 1
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        if name not in self._factories and name in GRAPH_MODULES:
+            importlib.import_module(GRAPH_MODULES[name])
+        with self._lock:
+            graph = self._graphs.get(name)
+            if graph is not None:
+                return graph
+            if name not in self._factories:
+                raise KeyError(f"No graph registered as '{name}'")
+            start = time.perf_counter()
+            graph = self._factories[name]()
+            self._compile_seconds[name] = time.perf_counter() - start
+            self._graphs[name] = graph
+        print(f"[graph_registry] Compiled '{name}' in {self._compile_seconds[name] * 1000:.1f}ms", file=sys.stderr)
+        return graph
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> dict:
+        """Compile the given graphs (all known ones by default) and return their compile times."""
+        for name in names or list(GRAPH_MODULES):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"[graph_registry] Could not compile '{name}': {e}", file=sys.stderr)
+        return dict(self._compile_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "compiled": sorted(self._graphs),
+            "compile_ms": {name: round(s * 1000, 2) for name, s in self._compile_seconds.items()},
+            "lookups": self.lookups,
+        }
+
+
+graph_registry = GraphRegistry()
@@ -0,0 +1,102 @@
+"""Auth and log-query latency under concurrent load.
+
+Drives the API in-process (httpx ASGI transport) against DATABASE_URL: seeds a
+user and some logs, then fires `--concurrency` parallel streams of `/auth/me`
+requests (JWT decode + profile lookup) and of session log-page queries. It reports
+p50/p95/p99 per operation and the worst event-loop stall seen meanwhile.
+
+    DATABASE_URL=sqlite:///bench.db python -m MultiAgents_Workflow.benchmarks.db_latency --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _report(label: str, samples: list):
+    print(f"{label:<14} n={len(samples):<6} p50 {_percentile(samples, 50) * 1000:8.2f}ms  "
+          f"p95 {_percentile(samples, 95) * 1000:8.2f}ms  p99 {_percentile(samples, 99) * 1000:8.2f}ms  "
+          f"mean {statistics.mean(samples) * 1000:8.2f}ms")
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def main(concurrency: int, requests: int, logs: int):
+    import httpx
+    from sqlalchemy import select
+
+    from MultiAgents_Workflow.core.database import Base, engine, pool_stats, sessionlocal
+    from MultiAgents_Workflow.core.main import app
+    from MultiAgents_Workflow.core.models import Log, Profile, upgrade_schema
+    from MultiAgents_Workflow.core.routes.auth import create_access_token, get_password_hash
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    async with sessionlocal() as db:
+        user = Profile(email=email, name="bench", password=get_password_hash("bench-password"))
+        db.add(user)
+        await db.commit()
+        db.add_all([Log(user_id=user.id, session_id=f"bench-{i % 20}", agent="research-agent", stage="event",
+                        message=f"log {i}") for i in range(logs)])
+        await db.commit()
+        user_id = user.id
+    token = create_access_token({"sub": email})
+
+    async def auth_call(client):
+        response = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+
+    async def log_query(_client):
+        async with sessionlocal() as db:
+            await db.execute(select(Log).where(Log.user_id == user_id, Log.session_id == "bench-0")
+                             .order_by(Log.timestamp, Log.id).limit(50))
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, op in (("auth /me", auth_call), ("log query", log_query)):
+            samples = []
+
+            async def worker():
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    await op(client)
+                    samples.append(time.perf_counter() - start)
+
+            stop = asyncio.Event()
+            lag = asyncio.create_task(_loop_lag(stop))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            _report(label, samples)
+            print(f"{'':<14} {len(samples) / elapsed:8.1f} req/s  worst loop stall {await lag * 1000:.1f}ms")
+
+    print(f"pool: {pool_stats()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=25, help="requests per concurrent client")
+    parser.add_argument("--logs", type=int, default=1000, help="log rows to seed")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.requests, args.logs))
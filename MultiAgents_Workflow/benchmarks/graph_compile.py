@@ -0,0 +1,58 @@
+"""Startup and per-request graph overhead.
+
+Compares compiling the interview subgraph for every analyst (the old
+behaviour) with fetching the shared compiled graph from the registry, and
+reports how long warming up every registered graph takes at startup.
+
+    python -m MultiAgents_Workflow.benchmarks.graph_compile --requests 20 --analysts 4
+"""
+import argparse
+import statistics
+import time
+
+
+def _timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label: str, samples: list):
+    print(f"{label:<28} total {sum(samples) * 1000:9.2f}ms  "
+          f"median {statistics.median(samples) * 1000:8.3f}ms  max {max(samples) * 1000:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20, help="simulated research requests")
+    parser.add_argument("--analysts", type=int, default=4, help="analysts (interviews) per request")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from MultiAgents_Workflow.agents.graph_registry import graph_registry
+    from MultiAgents_Workflow.agents.ResearchAgent.graph.serach_ask_answer import (
+        interview_builder,
+        interview_checkpointer,
+    )
+    print(f"{'import graph modules':<28} total {(time.perf_counter() - start) * 1000:9.2f}ms")
+
+    warm = graph_registry.warm_up()
+    print(f"{'warm_up (all graphs)':<28} total {sum(warm.values()) * 1000:9.2f}ms  "
+          + "  ".join(f"{name}={s * 1000:.1f}ms" for name, s in warm.items()))
+
+    interviews = args.requests * args.analysts
+    per_request_compile = _timed(lambda: interview_builder.compile(checkpointer=interview_checkpointer), interviews)
+    registry_lookup = _timed(lambda: graph_registry.get("interview"), interviews)
+
+    print(f"\n{interviews} interviews ({args.requests} requests x {args.analysts} analysts)")
+    _report("compile per interview", per_request_compile)
+    _report("registry lookup", registry_lookup)
+    saved = (sum(per_request_compile) - sum(registry_lookup)) / args.requests
+    print(f"{'saved per request':<28} {saved * 1000:9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
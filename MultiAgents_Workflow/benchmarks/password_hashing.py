@@ -0,0 +1,68 @@
+"""bcrypt cost per work factor, and what a login burst does to the event loop.
+
+For each `--rounds` value it times single hashes, then runs a burst of
+`--burst` concurrent verifications twice: inline in the coroutine (the old
+handlers) and through `PasswordHasher`'s pool, reporting wall time and the
+worst event-loop stall seen meanwhile. Pick BCRYPT_ROUNDS from the first table.
+
+    python -m MultiAgents_Workflow.benchmarks.password_hashing --rounds 10 11 12 --burst 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from MultiAgents_Workflow.core.passwords import PasswordHasher, check_password, hash_password
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _burst(label: str, verify, burst: int):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(burst)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    print(f"  {label:<8} burst of {burst}: {elapsed * 1000:8.1f}ms  worst loop stall {await lag * 1000:8.1f}ms")
+
+
+async def main(rounds_list: list, samples: int, burst: int, workers: int):
+    for rounds in rounds_list:
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hashed = hash_password("benchmark-password", rounds)
+            timings.append(time.perf_counter() - start)
+        print(f"rounds={rounds:<3} hash mean {statistics.mean(timings) * 1000:8.1f}ms  "
+              f"max {max(timings) * 1000:8.1f}ms")
+
+        async def inline():
+            check_password("benchmark-password", hashed)
+
+        hasher = PasswordHasher(rounds=rounds, workers=workers, queue_limit=burst)
+
+        async def pooled():
+            await hasher.verify("benchmark-password", hashed)
+
+        await _burst("inline", inline, burst)
+        await _burst("pool", pooled, burst)
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--samples", type=int, default=5, help="single hashes timed per cost")
+    parser.add_argument("--burst", type=int, default=20, help="concurrent verifications per burst")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.samples, args.burst, args.workers))
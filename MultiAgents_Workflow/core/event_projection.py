@@ -0,0 +1,159 @@
+"""Projection of LangGraph `astream_events` output onto the SSE wire format.
+
+`compact` mode (the default) forwards only allowlisted event kinds emitted by
+allowlisted graph nodes, and reduces each to a small dict: chat model streams
+carry just their text delta, the writers' `writer_delta` custom events their
+section text as it is generated, everything else just its kind and node. `full`
+mode is the legacy behaviour - every event with `str(data)` - kept for
+comparison. Events are encoded once, with orjson when it is installed.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+load_dotenv()
+
+
+def _csv(value: str) -> frozenset:
+    return frozenset(v.strip() for v in value.split(",") if v.strip())
+
+
+RESEARCH_STREAM_MODE = os.getenv("RESEARCH_STREAM_MODE", "compact").lower()
+RESEARCH_STREAM_EVENTS = _csv(os.getenv(
+    "RESEARCH_STREAM_EVENTS",
+    "on_chain_start,on_chain_end,on_chat_model_stream,on_tool_start,on_tool_end,on_custom_event",
+))
+RESEARCH_STREAM_NODES = _csv(os.getenv(
+    "RESEARCH_STREAM_NODES",
+    "create_analysts,initialize_interviews,conduct_interview,ask_question,plan_search,search_web,"
+    "search_wikipedia,answer_question,save_interview,write_section,write_report,write_introduction,"
+    "write_conclusion,finalize_report",
+))
+STREAM_MODES = ("compact", "full")
+# Nodes that publish their own `writer_delta` custom events; their raw token events would duplicate them
+DELTA_NODES = frozenset({"write_section", "write_report", "write_introduction", "write_conclusion"})
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class EventProjector:
+    """Filters and reshapes one run's events, counting what it sends."""
+
+    def __init__(self, mode: Optional[str] = None, events: frozenset = RESEARCH_STREAM_EVENTS,
+                 nodes: frozenset = RESEARCH_STREAM_NODES):
+        mode = (mode or RESEARCH_STREAM_MODE).lower()
+        if mode not in STREAM_MODES:
+            raise ValueError(f"Unknown stream mode '{mode}', expected one of {STREAM_MODES}")
+        self.mode = mode
+        self.events = events
+        self.nodes = nodes
+        self.seen = 0
+        self.sent = 0
+        self.bytes = 0
+        self.encode_seconds = 0.0
+
+    def project(self, event: dict) -> Optional[dict]:
+        """Wire dict for an `astream_events` event, or None if it is filtered out."""
+        kind = event.get("event")
+        name = event.get("name", "")
+        if self.mode == "full":
+            return {
+                "type": "event",
+                "event": kind,
+                "name": name,
+                "data": str(event.get("data", {})),
+                "tags": list(event.get("tags") or []),
+                "timestamp": str(event.get("timestamp")) if event.get("timestamp") else "",
+            }
+
+        node = (event.get("metadata") or {}).get("langgraph_node")
+        if kind not in self.events or node not in self.nodes:
+            return None
+        data = event.get("data") or {}
+        if kind in ("on_chain_start", "on_chain_end"):
+            # Only the node itself, not the prompts/parsers/sub-chains running inside it
+            if name != node:
+                return None
+            return {"type": "event", "event": kind, "name": name, "node": node}
+        if kind == "on_chat_model_stream":
+            if node in DELTA_NODES:
+                return None
+            chunk = data.get("chunk")
+            delta = getattr(chunk, "content", None)
+            if not delta or not isinstance(delta, str):
+                return None
+            return {"type": "event", "event": kind, "node": node, "delta": delta}
+        if kind == "on_custom_event":
+            return {"type": "event", "event": kind, "name": name, "node": node, "data": data}
+        return {"type": "event", "event": kind, "name": name, "node": node}
+
+    def encode(self, event: dict, **extra) -> Optional[bytes]:
+        """Project and encode an event, adding `extra` fields; None if it is filtered out."""
+        self.seen += 1
+        start = time.perf_counter()
+        projected = self.project(event)
+        if projected is not None and extra:
+            projected.update(extra)
+        encoded = dumps(projected) if projected is not None else None
+        self.encode_seconds += time.perf_counter() - start
+        if encoded is not None:
+            self.sent += 1
+            self.bytes += len(encoded)
+        return encoded
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "events_seen": self.seen,
+            "events_sent": self.sent,
+            "bytes": self.bytes,
+            "encode_ms": round(self.encode_seconds * 1000, 2),
+            "encoder": "orjson" if orjson is not None else "json",
+        }
+
+
+_totals: dict[str, dict] = {}
+_totals_lock = threading.Lock()
+
+
+def record_session(projector: EventProjector):
+    """Add a finished session's counters to the per-mode totals."""
+    with _totals_lock:
+        totals = _totals.setdefault(projector.mode, {"sessions": 0, "events_seen": 0, "events_sent": 0,
+                                                     "bytes": 0, "encode_seconds": 0.0})
+        totals["sessions"] += 1
+        totals["events_seen"] += projector.seen
+        totals["events_sent"] += projector.sent
+        totals["bytes"] += projector.bytes
+        totals["encode_seconds"] += projector.encode_seconds
+
+
+def projection_stats() -> dict:
+    """Per-mode totals plus per-session averages."""
+    with _totals_lock:
+        out = {}
+        for mode, t in _totals.items():
+            sessions = t["sessions"] or 1
+            out[mode] = {
+                "sessions": t["sessions"],
+                "events_seen": t["events_seen"],
+                "events_sent": t["events_sent"],
+                "bytes": t["bytes"],
+                "bytes_per_session": round(t["bytes"] / sessions),
+                "encode_ms_per_session": round(t["encode_seconds"] * 1000 / sessions, 2),
+            }
+        return out
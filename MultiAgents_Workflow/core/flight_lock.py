@@ -0,0 +1,85 @@
+"""Cross-process single-flight lock backed by a local SQLite table.
+
+Several API processes on one host share RESEARCH_FLIGHT_LOCK_DB. The process
+that acquires a run key executes the run; the others wait for the key to be
+released and then pick up the result through the topic index. A holder that
+dies leaves its lock to expire after RESEARCH_FLIGHT_LOCK_TTL_SECONDS. Disabled
+when RESEARCH_FLIGHT_LOCK_DB is unset; in-process deduplication does not need it.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+RESEARCH_FLIGHT_LOCK_DB = os.getenv("RESEARCH_FLIGHT_LOCK_DB", "")
+RESEARCH_FLIGHT_LOCK_TTL_SECONDS = float(os.getenv("RESEARCH_FLIGHT_LOCK_TTL_SECONDS", "1800"))
+RESEARCH_FLIGHT_POLL_SECONDS = float(os.getenv("RESEARCH_FLIGHT_POLL_SECONDS", "1.0"))
+
+
+class FlightLock:
+    def __init__(self, path: str, ttl_seconds: float = RESEARCH_FLIGHT_LOCK_TTL_SECONDS,
+                 poll_seconds: float = RESEARCH_FLIGHT_POLL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = poll_seconds
+        self.acquired = 0
+        self.contended = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS run_flights "
+                         "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def _try_acquire(self, key: str, owner: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at FROM run_flights WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > time.time():
+                conn.execute("COMMIT")
+                return row[0]
+            conn.execute("INSERT OR REPLACE INTO run_flights (key, owner, expires_at) VALUES (?, ?, ?)",
+                         (key, owner, time.time() + self.ttl_seconds))
+            conn.execute("COMMIT")
+            return None
+
+    async def try_acquire(self, key: str, owner: str) -> Optional[str]:
+        """Take `key` for `owner`; returns None on success, else the current holder."""
+        holder = await asyncio.to_thread(self._try_acquire, key, owner)
+        if holder is None:
+            self.acquired += 1
+        else:
+            self.contended += 1
+        return holder
+
+    def _release(self, key: str, owner: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM run_flights WHERE key = ? AND owner = ?", (key, owner))
+
+    async def release(self, key: str, owner: str):
+        await asyncio.to_thread(self._release, key, owner)
+
+    def _held(self, key: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT expires_at FROM run_flights WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    async def wait_released(self, key: str):
+        """Return once nobody holds `key` (released, or expired)."""
+        while await asyncio.to_thread(self._held, key):
+            await asyncio.sleep(self.poll_seconds)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "acquired": self.acquired, "contended": self.contended}
+
+
+flight_lock = FlightLock(RESEARCH_FLIGHT_LOCK_DB) if RESEARCH_FLIGHT_LOCK_DB else None
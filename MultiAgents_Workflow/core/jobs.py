@@ -0,0 +1,388 @@
+"""Background job engine for long-running agent runs.
+
+A job is started by `submit` and executed by a bounded pool of worker tasks,
+independently of any HTTP connection. Every event the job emits is numbered
+and kept in a bounded ring buffer that spills to disk, so SSE clients can
+attach, drop and re-attach by session id - resuming after their Last-Event-ID -
+without restarting the work.
+"""
+import asyncio
+import functools
+import os
+import re
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Union
+
+from dotenv import load_dotenv
+
+from .event_projection import dumps
+
+load_dotenv()
+
+
+RESEARCH_JOB_WORKERS = int(os.getenv("RESEARCH_JOB_WORKERS", "2"))
+RESEARCH_JOB_QUEUE_DEPTH = int(os.getenv("RESEARCH_JOB_QUEUE_DEPTH", "20"))
+RESEARCH_JOB_RETENTION_SECONDS = float(os.getenv("RESEARCH_JOB_RETENTION_SECONDS", "1800"))
+JOB_EVENT_BUFFER_SIZE = int(os.getenv("JOB_EVENT_BUFFER_SIZE", "1000"))
+JOB_EVENT_SPILL_DIR = os.getenv("JOB_EVENT_SPILL_DIR", os.path.join(".cache", "job_events"))
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised by `submit` when the queue already holds `queue_depth` waiting jobs."""
+
+
+class EventLog:
+    """Numbered event history: the newest events in memory, older ones spilled to a JSONL file.
+
+    Events are stored JSON-encoded, so each is serialized once however many clients replay it.
+    """
+
+    def __init__(self, name: str, size: int = JOB_EVENT_BUFFER_SIZE, spill_dir: str = JOB_EVENT_SPILL_DIR):
+        self.size = max(1, size)
+        self.spill_path = os.path.join(spill_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".jsonl")
+        self.last_id = 0
+        self.spilled = 0
+        self._buffer: deque = deque()
+        self._spill_file = None
+
+    def append(self, event: Union[dict, bytes]) -> int:
+        if not isinstance(event, bytes):
+            event = dumps(event)
+        self.last_id += 1
+        if len(self._buffer) >= self.size:
+            self._spill(*self._buffer.popleft())
+        self._buffer.append((self.last_id, event))
+        return self.last_id
+
+    def _spill(self, event_id: int, event: bytes):
+        if self._spill_file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+            self._spill_file = open(self.spill_path, "wb")
+        self._spill_file.write(b"%d\t%s\n" % (event_id, event))
+        self._spill_file.flush()
+        self.spilled = event_id
+
+    def since(self, last_id: int) -> Iterator[tuple[int, bytes]]:
+        """Encoded events with an id above `last_id`, oldest first."""
+        if last_id < self.spilled:
+            with open(self.spill_path, "rb") as f:
+                for line in f:
+                    event_id, event = line.rstrip(b"\n").split(b"\t", 1)
+                    if int(event_id) > last_id:
+                        yield int(event_id), event
+            last_id = max(last_id, self.spilled)
+        # Snapshot: the buffer keeps changing while subscribers are suspended
+        yield from [item for item in list(self._buffer) if item[0] > last_id]
+
+    def close(self, remove: bool = False):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if remove and self.spilled:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+
+
+@dataclass
+class Job:
+    session_id: str
+    runner: Callable[["Job"], Awaitable[Any]]
+    user_id: Optional[int] = None
+    meta: dict = field(default_factory=dict)
+    status: str = QUEUED
+    error: Optional[str] = None
+    result: Any = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: Optional[EventLog] = None
+    subscribers: int = 0
+    flight_key: Optional[str] = None
+    followers: int = 0  # unfinished jobs relaying this one's run
+    cancel_requested: bool = False
+    _leader: Optional["Job"] = field(default=None, repr=False)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.events is None:
+            self.events = EventLog(self.session_id)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def emit(self, event: Union[dict, bytes]) -> int:
+        """Record an event (a dict, or JSON already encoded), wake every subscriber and return its id."""
+        event_id = self.events.append(event)
+        self._notify()
+        return event_id
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def stream(self, last_event_id: int = 0) -> AsyncIterator[tuple[int, bytes]]:
+        """Yield `(id, encoded event)` after `last_event_id`, then live ones until the job finishes."""
+        self.subscribers += 1
+        try:
+            while True:
+                changed = self._changed
+                for event_id, event in self.events.since(last_event_id):
+                    yield event_id, event
+                    last_event_id = event_id
+                if self.done and last_event_id >= self.events.last_id:
+                    return
+                if last_event_id >= self.events.last_id:
+                    await changed.wait()
+        finally:
+            self.subscribers -= 1
+
+    def info(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": self.events.last_id,
+            "subscribers": self.subscribers,
+            "followers": self.followers,
+            "cancel_requested": self.cancel_requested,
+            **self.meta,
+        }
+
+
+class JobEngine:
+    """Bounded queue plus a fixed pool of worker tasks that run jobs to completion."""
+
+    def __init__(self, name: str, workers: int = RESEARCH_JOB_WORKERS,
+                 queue_depth: int = RESEARCH_JOB_QUEUE_DEPTH,
+                 retention_seconds: float = RESEARCH_JOB_RETENTION_SECONDS):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_depth = queue_depth
+        self.retention_seconds = retention_seconds
+        self._jobs: dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.collapsed = 0
+        self._flights: dict[str, Job] = {}
+        self._listeners: list[Callable[[Job, str], Awaitable[None]]] = []
+        self._notifications: dict[str, asyncio.Task] = {}
+        self._immediate: set[asyncio.Task] = set()
+
+    def add_listener(self, listener: Callable[[Job, str], Awaitable[None]]):
+        """Call `await listener(job, status)` on every status change (queued, running, finished)."""
+        self._listeners.append(listener)
+
+    def _status_changed(self, job: Job):
+        if not self._listeners:
+            return
+        # Chained per session so listeners see one job's transitions in order
+        previous = self._notifications.get(job.session_id)
+        task = asyncio.create_task(self._call_listeners(job, job.status, previous))
+        self._notifications[job.session_id] = task
+        task.add_done_callback(lambda t, sid=job.session_id: self._notification_done(sid, t))
+
+    def _notification_done(self, session_id: str, task: asyncio.Task):
+        if self._notifications.get(session_id) is task:
+            del self._notifications[session_id]
+
+    async def _call_listeners(self, job: Job, status: str, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        for listener in self._listeners:
+            try:
+                await listener(job, status)
+            except Exception as e:
+                print(f"[jobs:{self.name}] Status listener failed for {job.session_id}: {e}", file=sys.stderr)
+
+    def _ensure_workers(self):
+        # Workers are bound to the loop that serves requests, so start them on first use
+        if self._workers and not all(w.done() for w in self._workers):
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[jobs:{self.name}] Started {self.workers} workers (queue depth {self.queue_depth})", file=sys.stderr)
+
+    def submit(self, session_id: str, runner: Callable[[Job], Awaitable[Any]],
+               user_id: Optional[int] = None, immediate: bool = False, flight_key: Optional[str] = None,
+               follower: Optional[Callable[[Job, Job], Awaitable[Any]]] = None, **meta) -> Job:
+        """Queue a job for `session_id`, or return the job already registered under it.
+
+        `immediate` jobs skip the queue and start at once; only for runners that finish quickly.
+        Single flight: while a job submitted with `flight_key` is unfinished, a later submission
+        with the same key runs `follower(leader, job)` instead of `runner`, immediately, since it
+        only relays the leader's work.
+        """
+        self._prune()
+        job = self._jobs.get(session_id)
+        if job is not None and (not job.done or job.status == COMPLETED):
+            return job
+        self._ensure_workers()
+        leader = self._flights.get(flight_key) if flight_key is not None else None
+        if leader is not None and leader.cancel_requested:
+            leader = None  # its owner wants it gone; do not extend its life with a new follower
+        if leader is not None and follower is not None:
+            self.collapsed += 1
+            runner = functools.partial(follower, leader)
+            immediate = True
+            meta["follows"] = leader.session_id
+            print(f"[jobs:{self.name}] {session_id} follows {leader.session_id}", file=sys.stderr)
+        if not immediate and self._queue.qsize() >= self.queue_depth:
+            self.rejected += 1
+            raise JobQueueFull(f"{self.name} queue is full ({self.queue_depth} waiting jobs)")
+        previous = job
+        # Engines may hold the same session id; the spill file is named for both
+        job = Job(session_id=session_id, runner=runner, user_id=user_id, meta=meta,
+                  events=EventLog(f"{self.name}-{session_id}"))
+        if flight_key is not None and leader is None:
+            job.flight_key = flight_key
+            self._flights[flight_key] = job
+        elif leader is not None and follower is not None:
+            job._leader = leader
+            leader.followers += 1
+        if previous is not None:
+            # A re-run continues the numbering so a stale Last-Event-ID cannot hide new events
+            previous.events.close(remove=True)
+            job.events.last_id = previous.events.last_id
+        self._jobs[session_id] = job
+        self._status_changed(job)
+        if immediate:
+            task = asyncio.create_task(self._execute(job))
+            self._immediate.add(task)
+            task.add_done_callback(self._immediate.discard)
+            return job
+        self._queue.put_nowait(job)
+        print(f"[jobs:{self.name}] Queued {session_id} (depth {self._queue.qsize()})", file=sys.stderr)
+        return job
+
+    def get(self, session_id: str) -> Optional[Job]:
+        return self._jobs.get(session_id)
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it was already finished.
+
+        A job other sessions follow keeps running for them: the cancellation takes
+        effect once its last follower has finished.
+        """
+        job = self._jobs.get(session_id)
+        if job is None or job.done:
+            return False
+        if job.followers > 0:
+            job.cancel_requested = True
+            print(f"[jobs:{self.name}] Cancel of {session_id} deferred: {job.followers} followers", file=sys.stderr)
+            return True
+        if job._task is not None:
+            job._task.cancel()
+        else:
+            # Still queued: the worker skips it when it is dequeued
+            self._finish(job, CANCELLED)
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.done:
+                    await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._status_changed(job)
+        job._task = asyncio.create_task(job.runner(job))
+        try:
+            job.result = await job._task
+            self._finish(job, COMPLETED)
+        except asyncio.CancelledError:
+            if not job._task.cancelled():
+                raise  # the worker itself is being stopped
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            print(f"[jobs:{self.name}] Job {job.session_id} failed: {e}", file=sys.stderr)
+            self._finish(job, FAILED, str(e))
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.events.close()
+        if job.flight_key is not None and self._flights.get(job.flight_key) is job:
+            del self._flights[job.flight_key]
+        if status == COMPLETED:
+            self.completed += 1
+        elif status == FAILED:
+            self.failed += 1
+        else:
+            self.cancelled += 1
+        job._notify()
+        self._status_changed(job)
+        leader, job._leader = job._leader, None
+        if leader is not None:
+            leader.followers -= 1
+            if leader.followers == 0 and leader.cancel_requested and not leader.done:
+                self.cancel(leader.session_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for session_id in [s for s, j in self._jobs.items() if j.done and j.finished_at < cutoff]:
+            self._jobs.pop(session_id).events.close(remove=True)
+
+    async def stop(self):
+        """Cancel running jobs and stop the workers."""
+        for job in self._jobs.values():
+            if not job.done and job._task is not None:
+                job._task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, *self._immediate, return_exceptions=True)
+        self._workers = []
+        await asyncio.gather(*self._notifications.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        statuses = [j.status for j in self._jobs.values()]
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "in_flight": len(self._flights),
+            "collapsed": self.collapsed,
+        }
+
+
+def sse_resume_id(request, fallback: int = 0) -> int:
+    """Event id to resume after: the Last-Event-ID header, else an explicit query value."""
+    header = request.headers.get("last-event-id", "")
+    return int(header) if header.isdigit() else max(0, fallback or 0)
+
+
+def sse_frame(event_id: int, event: bytes) -> bytes:
+    return b"id: %d\ndata: %s\n\n" % (event_id, event)
+
+
+research_jobs = JobEngine("research")
+# The unauthenticated agent adapter gets its own engine, so its session ids can never reach frontend jobs
+adapter_jobs = JobEngine("research-adapter")
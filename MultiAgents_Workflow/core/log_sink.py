@@ -0,0 +1,172 @@
+"""Batched, asynchronous writer for `Log` rows.
+
+Callers enqueue records and return immediately; a background task inserts them
+in bulk once LOG_SINK_BATCH_SIZE records are waiting or LOG_SINK_FLUSH_SECONDS
+have passed. The queue is bounded (LOG_SINK_MAX_QUEUE); when it is full,
+LOG_SINK_POLICY decides what happens:
+  drop_oldest - discard the oldest queued record (default; streams never wait)
+  drop_newest - discard the record being written
+  block       - wait up to LOG_SINK_BLOCK_SECONDS for room, then drop it
+`close()` flushes everything still queued and is called on shutdown.
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
+
+from .database import sessionlocal
+from .models import Log
+
+load_dotenv()
+
+
+LOG_SINK_MAX_QUEUE = int(os.getenv("LOG_SINK_MAX_QUEUE", "10000"))
+LOG_SINK_BATCH_SIZE = int(os.getenv("LOG_SINK_BATCH_SIZE", "200"))
+LOG_SINK_FLUSH_SECONDS = float(os.getenv("LOG_SINK_FLUSH_SECONDS", "0.5"))
+LOG_SINK_POLICY = os.getenv("LOG_SINK_POLICY", "drop_oldest").lower()
+LOG_SINK_BLOCK_SECONDS = float(os.getenv("LOG_SINK_BLOCK_SECONDS", "1.0"))
+LOG_SINK_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class LogSink:
+    """Bounded in-memory queue of log records drained by bulk inserts."""
+
+    def __init__(self, max_queue: int = LOG_SINK_MAX_QUEUE, batch_size: int = LOG_SINK_BATCH_SIZE,
+                 flush_seconds: float = LOG_SINK_FLUSH_SECONDS, policy: str = LOG_SINK_POLICY,
+                 block_seconds: float = LOG_SINK_BLOCK_SECONDS):
+        if policy not in LOG_SINK_POLICIES:
+            raise ValueError(f"LOG_SINK_POLICY must be one of {LOG_SINK_POLICIES}, got '{policy}'")
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.policy = policy
+        self.block_seconds = block_seconds
+
+        self._queue: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.flush_seconds_total = 0.0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    async def write(self, user_id: Optional[int], agent: str, stage: str, message: str,
+                    session_id: Optional[str] = None) -> bool:
+        """Queue a log record; returns False if it was dropped."""
+        if user_id is None:
+            return False
+        self._ensure_started()
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.policy == "drop_oldest":
+                self._queue.popleft()
+                self.dropped += 1
+            else:
+                self._wakeup.set()
+                deadline = time.monotonic() + self.block_seconds
+                while len(self._queue) >= self.max_queue:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.dropped += 1
+                        return False
+                    self._room.clear()
+                    try:
+                        await asyncio.wait_for(self._room.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+        self._queue.append({
+            "user_id": user_id,
+            "session_id": session_id,
+            "agent": agent,
+            "stage": stage,
+            "message": message,
+            "timestamp": datetime.now(timezone.utc).replace(tzinfo=None),
+        })
+        self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Insert everything queued so far, one bulk insert per batch."""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._room.set()
+                start = time.perf_counter()
+                try:
+                    async with sessionlocal() as db:
+                        await db.execute(insert(Log), batch)
+                        await db.commit()
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as e:
+                    # Never retried: a broken database must not grow the queue without bound
+                    self.failed += len(batch)
+                    print(f"[log_sink] Dropped batch of {len(batch)} logs: {e}", file=sys.stderr)
+                self.flush_seconds_total += time.perf_counter() - start
+
+    async def close(self):
+        """Stop the background task and flush what is left."""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            # Let an in-flight insert finish instead of cancelling it mid-batch
+            self._closing = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+        self._closing = False
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0,
+            "flush_ms_total": round(self.flush_seconds_total * 1000, 2),
+        }
+
+
+log_sink = LogSink()
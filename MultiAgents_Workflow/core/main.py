@@ -1,11 +1,31 @@
 ﻿from fastapi import FastAPI,HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine,Base
+from .database import engine,Base,pool_stats
 
 from .routes.research_adapter import router as research_router
 from .routes.writer_adapter import router as writer_router
 from .routes.auth import router as auth_router
 from .routes.frontend_api import router as frontend_api_router
+from .routes.reports import router as reports_router
+from MultiAgents_Workflow.agents.ResearchAgent.llm.llm import llm_cache
+from MultiAgents_Workflow.agents.ResearchAgent.llm.rate_limit import llm_rate_limiter
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import routing_stats
+from MultiAgents_Workflow.agents.ResearchAgent.utils.search_cache import search_cache
+from MultiAgents_Workflow.agents.ResearchAgent.utils.context_packer import packer_stats
+from MultiAgents_Workflow.agents.ResearchAgent.utils.doc_store import doc_stores
+from MultiAgents_Workflow.agents.ResearchAgent.graph.graph_main import memory as research_checkpointer, close_checkpointers
+from MultiAgents_Workflow.agents.ResearchAgent.graph.serach_ask_answer import interview_checkpointer
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
+from .jobs import adapter_jobs, research_jobs
+from .event_projection import projection_stats
+from .log_sink import log_sink
+from .principal_cache import principal_cache
+from .passwords import password_hasher
+from .report_store import report_store
+from .topic_index import topic_index
+from .flight_lock import flight_lock
+from .models import upgrade_schema
+from .sessions import track_sessions
 
 app = FastAPI(
     title="Multi-Agent Research Platform",
@@ -24,21 +44,62 @@ app.add_middleware(
 )
 
 @app.on_event("startup")
-def _startup():
+async def _startup():
     print("TABLE CREATING")
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)
         print("TABLES CREATED")
     except Exception as e:
         print(e)
         raise HTTPException(status_code='500',detail="TABLES NOT CREATED")
+    # Adapter jobs are not recorded: their user_id comes unauthenticated from the query string
+    track_sessions(research_jobs)
+    # Compile every graph up front so the first request does not pay for it
+    graph_registry.warm_up()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await research_jobs.stop()
+    await adapter_jobs.stop()
+    # After the jobs, so their last log lines are part of the final flush
+    await log_sink.close()
+    await close_checkpointers()
+    await engine.dispose()
+    password_hasher.shutdown()
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/metrics")
+def metrics():
+    """Counters of the in-process caches and schedulers."""
+    return {
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "llm_rate_limit": llm_rate_limiter.stats(),
+        "llm_routing": routing_stats(),
+        "search_cache": search_cache.stats() if search_cache else None,
+        "context_packer": packer_stats.snapshot(),
+        "doc_stores": doc_stores.stats(),
+        "checkpointers": [research_checkpointer.stats(), interview_checkpointer.stats()],
+        "graphs": graph_registry.stats(),
+        "research_jobs": research_jobs.stats(),
+        "adapter_jobs": adapter_jobs.stats(),
+        "research_streams": projection_stats(),
+        "db_pool": pool_stats(),
+        "log_sink": log_sink.stats(),
+        "principal_cache": principal_cache.stats(),
+        "passwords": password_hasher.stats(),
+        "report_store": report_store.stats(),
+        "topic_index": topic_index.stats(),
+        "flight_lock": flight_lock.stats() if flight_lock else None,
+    }
+
 # Mount all API routes
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(frontend_api_router, prefix="/api/v1", tags=["Frontend API"])
+app.include_router(reports_router, prefix="/api/v1", tags=["Reports"])
 app.include_router(research_router, prefix="/agents/research")
 app.include_router(writer_router,   prefix="/agents/writer")
@@ -1,5 +1,5 @@
 ﻿from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, Index, UniqueConstraint, func, inspect
 from .database  import Base
 
 
@@ -17,11 +17,81 @@ class Profile(Base):
 
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        # Serves "logs of one session, in order" and keyset pages over it
+        Index("ix_logs_user_session_ts", "user_id", "session_id", "timestamp", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("profiles.id", ondelete="CASCADE"), index=True)
+    session_id: Mapped[str | None] = mapped_column(String, nullable=True)
     agent: Mapped[str] = mapped_column(String, index=True)      # "research" | "writer"
     stage: Mapped[str] = mapped_column(String, index=True)      # e.g. "writer_delta", "compile_html"
     message: Mapped[str] = mapped_column(Text)                  # free text / JSON
     timestamp: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
     user: Mapped[Profile] = relationship("Profile", back_populates="logs")
+
+
+class ResearchSession(Base):
+    __tablename__ = "research_sessions"
+    __table_args__ = (
+        Index("ix_research_sessions_user_created", "user_id", "created_at", "id"),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True)     # the session_id clients use
+    user_id: Mapped[int] = mapped_column(ForeignKey("profiles.id", ondelete="CASCADE"))
+    agent: Mapped[str] = mapped_column(String)
+    topic: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String, index=True)       # queued | running | completed | failed | cancelled
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+    started_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+
+
+class Report(Base):
+    __tablename__ = "reports"
+    __table_args__ = (
+        UniqueConstraint("user_id", "session_id", "format", name="uq_reports_user_session_format"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("profiles.id", ondelete="CASCADE"))
+    session_id: Mapped[str] = mapped_column(String)
+    format: Mapped[str] = mapped_column(String)                    # markdown | html | pdf
+    topic: Mapped[str | None] = mapped_column(Text, nullable=True)
+    digest: Mapped[str] = mapped_column(String(64), index=True)    # sha256 of the uncompressed content
+    codec: Mapped[str] = mapped_column(String)                     # zstd | gzip | identity
+    size: Mapped[int] = mapped_column(Integer)
+    stored_size: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class TopicRun(Base):
+    __tablename__ = "topic_runs"
+    __table_args__ = (
+        Index("ix_topic_runs_key", "normalized_topic", "max_analysts", "created_at"),
+        Index("ix_topic_runs_recent", "max_analysts", "created_at"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    normalized_topic: Mapped[str] = mapped_column(Text)
+    max_analysts: Mapped[int] = mapped_column(Integer)
+    topic: Mapped[str] = mapped_column(Text)
+    session_id: Mapped[str] = mapped_column(String)                # the run that produced the result
+    result_digest: Mapped[str] = mapped_column(String(64))         # results JSON in the report store
+    result_codec: Mapped[str] = mapped_column(String)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
+def upgrade_schema(conn):
+    """Add columns/indexes that create_all does not add to tables created by older versions."""
+    inspector = inspect(conn)
+    if "logs" not in inspector.get_table_names():
+        return
+    if "session_id" not in {c["name"] for c in inspector.get_columns("logs")}:
+        print("Adding column logs.session_id")
+        conn.exec_driver_sql("ALTER TABLE logs ADD COLUMN session_id VARCHAR")
+    existing = {i["name"] for i in inspector.get_indexes("logs")}
+    for index in Log.__table__.indexes:
+        if index.name not in existing:
+            print(f"Creating index {index.name}")
+            index.create(conn)
@@ -0,0 +1,134 @@
+"""bcrypt hashing off the event loop.
+
+bcrypt is deliberately slow (~100-300 ms per call at the usual costs) and would
+stall every stream served by the same loop. Hashes and checks run on a small
+dedicated thread pool instead - bcrypt releases the GIL while it works - and at
+most PASSWORD_QUEUE_LIMIT calls may wait for a thread; beyond that callers get
+`PasswordPoolBusy` rather than an ever-growing backlog. BCRYPT_ROUNDS sets the
+cost of new hashes; `needs_rehash` tells when a stored hash uses another one.
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when PASSWORD_QUEUE_LIMIT hashing calls are already waiting for a worker."""
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a `$2b$12$...` hash, or None if it is not a bcrypt hash."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt calls, with timing counters."""
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = PASSWORD_WORKERS,
+                 queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.work_seconds = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordPoolBusy(f"{self._pending} password operations already pending")
+        self._pending += 1
+        submitted = time.perf_counter()
+        timings = {}
+
+        def timed():
+            timings["start"] = time.perf_counter()
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), timed)
+        finally:
+            self._pending -= 1
+            done = time.perf_counter()
+            started = timings.get("start", done)
+            self.wait_seconds += started - submitted
+            self.work_seconds += done - started
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(hash_password, password, self.rounds)
+        self.hashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        ok = await self._run(check_password, password, hashed)
+        self.verified += 1
+        return ok
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    async def rehash(self, password: str, hashed: str) -> Optional[str]:
+        """A new hash at the configured cost if `hashed` uses another one, else None."""
+        if not self.needs_rehash(hashed):
+            return None
+        new_hash = await self.hash(password)
+        self.rehashed += 1
+        print(f"[passwords] Rehashed a password from cost {hash_rounds(hashed)} to {self.rounds}", file=sys.stderr)
+        return new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        calls = self.hashed + self.verified
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self._pending,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds * 1000 / calls, 2) if calls else 0,
+            "avg_work_ms": round(self.work_seconds * 1000 / calls, 2) if calls else 0,
+        }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,114 @@
+"""In-process cache of authenticated principals, keyed by JWT subject.
+
+Resolving a token otherwise costs a profile lookup per request, which streaming
+and polling clients make constantly. An entry lives for PRINCIPAL_CACHE_TTL_SECONDS
+but never past the expiry of the token that filled it, and `invalidate` drops it
+as soon as the profile changes. Set PRINCIPAL_CACHE_TTL_SECONDS=0 to disable.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, detached from any DB session."""
+    id: int
+    email: str
+    name: str
+    created_at: datetime
+
+    @classmethod
+    def from_profile(cls, profile) -> "Principal":
+        return cls(id=profile.id, email=profile.email, name=profile.name, created_at=profile.created_at)
+
+
+class PrincipalCache:
+    """LRU map of subject -> (principal, deadline) with hit/miss counters."""
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, deadline = entry
+            if time.time() >= deadline:
+                del self._entries[subject]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return principal
+
+    def put(self, subject: str, principal: Principal, token_exp: Optional[float] = None):
+        """Cache `principal` until the TTL or `token_exp` (epoch seconds), whichever comes first."""
+        if not self.enabled:
+            return
+        deadline = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            deadline = min(deadline, token_exp)
+        with self._lock:
+            self._entries[subject] = (principal, deadline)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str):
+        """Forget `subject`; call whenever its profile is created, changed or deleted."""
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
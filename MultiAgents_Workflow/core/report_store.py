@@ -0,0 +1,150 @@
+"""Content-addressed store for finished reports.
+
+Each rendition (markdown, HTML, PDF) of a report is written once to
+REPORT_STORE_DIR under its SHA-256, compressed with zstd when `zstandard` is
+installed and gzip otherwise; PDFs are already compressed and stored as-is.
+Identical content is stored once however many sessions produce it. A `Report`
+row per (user, session, format) points at the blob, so serving a report is a
+lookup plus a file send - it is never regenerated.
+"""
+import asyncio
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from .database import sessionlocal
+from .models import Report
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+load_dotenv()
+
+
+REPORT_STORE_DIR = os.getenv("REPORT_STORE_DIR", os.path.join(".cache", "reports"))
+REPORT_STORE_CODEC = os.getenv("REPORT_STORE_CODEC", "zstd" if zstandard is not None else "gzip").lower()
+REPORT_STORE_LEVEL = int(os.getenv("REPORT_STORE_LEVEL", "0"))  # 0: the codec's default
+
+MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+EXTENSIONS = {"markdown": "md", "html": "html", "pdf": "pdf"}
+# Content-Encoding names; "identity" blobs are stored uncompressed
+CODEC_SUFFIX = {"zstd": ".zst", "gzip": ".gz", "identity": ""}
+
+
+@dataclass
+class Blob:
+    digest: str
+    codec: str
+    size: int
+    stored_size: int
+    path: str
+
+
+class ReportStore:
+    """Writes and reads compressed blobs addressed by the hash of their content."""
+
+    def __init__(self, root: str = REPORT_STORE_DIR, codec: str = REPORT_STORE_CODEC,
+                 level: int = REPORT_STORE_LEVEL):
+        if codec == "zstd" and zstandard is None:
+            print("[report_store] zstandard is not installed; using gzip", file=sys.stderr)
+            codec = "gzip"
+        if codec not in CODEC_SUFFIX:
+            raise ValueError(f"REPORT_STORE_CODEC must be one of {tuple(CODEC_SUFFIX)}, got '{codec}'")
+        self.root = root
+        self.codec = codec
+        self.level = level
+        self.writes = 0
+        self.deduplicated = 0
+        self.bytes_in = 0
+        self.bytes_stored = 0
+
+    def path_for(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + CODEC_SUFFIX[codec])
+
+    def _compress(self, data: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        if codec == "gzip":
+            return gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+        return data
+
+    def put(self, data: bytes, fmt: str) -> Blob:
+        """Store `data` unless a blob with the same content exists; blocking, see `aput`."""
+        codec = "identity" if fmt == "pdf" else self.codec
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, codec)
+        if os.path.exists(path):
+            self.deduplicated += 1
+            return Blob(digest, codec, len(data), os.path.getsize(path), path)
+
+        stored = self._compress(data, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so a reader never sees a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(stored)
+        os.replace(tmp, path)
+        self.writes += 1
+        self.bytes_in += len(data)
+        self.bytes_stored += len(stored)
+        return Blob(digest, codec, len(data), len(stored), path)
+
+    async def aput(self, data: bytes, fmt: str) -> Blob:
+        return await asyncio.to_thread(self.put, data, fmt)
+
+    def read(self, digest: str, codec: str) -> bytes:
+        """Decompressed content of a blob."""
+        with open(self.path_for(digest, codec), "rb") as f:
+            stored = f.read()
+        if codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(stored)
+        if codec == "gzip":
+            return gzip.decompress(stored)
+        return stored
+
+    async def save(self, user_id: int, session_id: str, fmt: str, data: bytes,
+                   topic: Optional[str] = None) -> Report:
+        """Store a rendition and point the session's (user, session, format) report row at it."""
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unknown report format '{fmt}', expected one of {tuple(MEDIA_TYPES)}")
+        blob = await self.aput(data, fmt)
+        async with sessionlocal() as db:
+            report = (await db.execute(select(Report).where(
+                Report.user_id == user_id, Report.session_id == session_id, Report.format == fmt,
+            ))).scalar_one_or_none()
+            if report is None:
+                report = Report(user_id=user_id, session_id=session_id, format=fmt)
+                db.add(report)
+            report.topic = topic or report.topic
+            report.digest = blob.digest
+            report.codec = blob.codec
+            report.size = blob.size
+            report.stored_size = blob.stored_size
+            await db.commit()
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "codec": self.codec,
+            "writes": self.writes,
+            "deduplicated": self.deduplicated,
+            "bytes_in": self.bytes_in,
+            "bytes_stored": self.bytes_stored,
+            "ratio": round(self.bytes_stored / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
+
+report_store = ReportStore()
@@ -1,14 +1,16 @@
 ﻿from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 import jwt
-import bcrypt
 from typing import Optional
 
-from ..database import get_db
+from ..database import get_db, sessionlocal
 from ..models import Profile
+from ..principal_cache import Principal, principal_cache
+from ..passwords import PasswordPoolBusy, check_password, hash_password, password_hasher
 
 router = APIRouter(tags=["Authentication"])
 security = HTTPBearer()
@@ -47,51 +49,78 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def get_profile_by_email(db: AsyncSession, email: str) -> Optional[Profile]:
+    result = await db.execute(select(Profile).where(Profile.email == email))
+    return result.scalar_one_or_none()
+
 def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    # Blocking; request handlers use password_hasher instead
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return hash_password(password)
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def _busy_exception(e: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Server busy, retry shortly ({e})", headers={"Retry-After": "1"})
+
+async def resolve_principal(token: str) -> Optional[Principal]:
+    """The user a JWT belongs to, or None if the token is invalid or the user is gone.
+
+    Shared by the Bearer dependency and the query-string token of the SSE endpoints;
+    the profile lookup is cached per subject for at most the token's lifetime.
+    """
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
-        raise credentials_exception
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+    async with sessionlocal() as db:
+        user = await get_profile_by_email(db, email)
+    if user is None:
+        return None
+    principal = Principal.from_profile(user)
+    principal_cache.put(email, principal, payload.get("exp"))
+    return principal
 
-    user = db.query(Profile).filter(Profile.email == email).first()
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Principal:
+    user = await resolve_principal(credentials.credentials)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(Profile).filter(Profile.email == user_data.email).first()
+    existing_user = await get_profile_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create new user - hash the password for security
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordPoolBusy as e:
+        raise _busy_exception(e)
     db_user = Profile(
         email=user_data.email,
         password=hashed_password,  # Store hashed password
         name=user_data.name  # Use 'name' field from Profile model
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    principal_cache.invalidate(db_user.email)
 
     # Return proper UserResponse format
     return UserResponse(
@@ -102,15 +131,28 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(Profile).filter(Profile.email == user_credentials.email).first()
-    if not user or not verify_password(user_credentials.password, user.password):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await get_profile_by_email(db, user_credentials.email)
+    try:
+        valid = user is not None and await password_hasher.verify(user_credentials.password, user.password)
+    except PasswordPoolBusy as e:
+        raise _busy_exception(e)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Move the stored hash to the configured BCRYPT_ROUNDS while the plain password is at hand
+    try:
+        new_hash = await password_hasher.rehash(user_credentials.password, user.password)
+    except PasswordPoolBusy:
+        new_hash = None  # next login
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
@@ -118,7 +160,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: Profile = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     return UserResponse(
         id=current_user.id,
         email=current_user.email,
@@ -1,14 +1,29 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, Request
+﻿from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import AsyncGenerator
+import asyncio
+import functools
+import html
 import json
+import os
 import uuid
-from sqlalchemy.orm import Session
+from markdown import markdown as md_to_html
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
-from ..models import Profile, Log
-from .auth import get_current_user
+from ..log_sink import log_sink
+from ..jobs import CANCELLED, COMPLETED, FAILED, Job, JobQueueFull, research_jobs, sse_frame, sse_resume_id
+from ..event_projection import RESEARCH_STREAM_MODE, STREAM_MODES, EventProjector, record_session
+from ..models import Log, ResearchSession
+from ..principal_cache import Principal
+from ..report_store import report_store
+from ..topic_index import TopicMatch, normalize_topic, topic_index
+from ..flight_lock import flight_lock
+from ..sessions import decode_cursor, encode_cursor, session_owner
+from .auth import get_current_user, resolve_principal
+from .reports import report_url
 from ..routes.research_adapter import _thread_cfg
 
 # Import the research graph
@@ -18,13 +33,10 @@ from pathlib import Path
 agent_dir = Path(__file__).parent.parent.parent / "agents" / "ResearchAgent" / "graph"
 sys.path.insert(0, str(agent_dir.parent.parent))
 
-try:
-    from agents.ResearchAgent.graph.graph_main import graph as research_graph
-except ImportError:
-    # Fallback for different environments
-    from ...agents.ResearchAgent.graph.graph_main import graph as research_graph
+# Always the package path: importing it as "agents..." loads a second copy and compiles the graph twice
+from MultiAgents_Workflow.agents.ResearchAgent.graph.graph_main import graph as research_graph
+from MultiAgents_Workflow.agents.ResearchAgent.llm.routing import validate_routes
 
-from ..models import Profile
 
 router = APIRouter(tags=["Frontend API"])
 
@@ -32,53 +44,290 @@ class AgentRequest(BaseModel):
     topic: str
     max_analysts: int = 2
     session_id: str = None
+    stream_mode: str | None = None
+    reuse: bool = True  # serve a recent run of the same (or a near-identical) topic if there is one
+    llm_routes: dict[str, str] | None = None  # graph node (or "*") -> model profile, for this run only
 
 class AgentResponse(BaseModel):
     session_id: str
     status: str
     message: str
 
+def _empty_results(topic: str) -> dict:
+    return {
+        'topic': topic,
+        'final_report': 'Research completed successfully. Results will be available shortly.',
+        'introduction': '',
+        'conclusion': '',
+        'sections': [],
+        'analysts': []
+    }
+
+async def _write_log(user_id: int, stage: str, message: str, session_id: str | None = None):
+    await log_sink.write(user_id, "research-agent", stage, message, session_id)
+
+def _report_html(topic: str, report_md: str) -> str:
+    title = html.escape(topic)
+    body = md_to_html(report_md, extensions=["tables"])
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head>"
+            f"<body>{body}</body></html>")
+
+async def _store_report(job: Job, results: dict) -> dict:
+    """Persist the final report's renditions; returns {format: url} of what was stored"""
+    report_md = results.get('final_report')
+    if job.user_id is None or not report_md:
+        return {}
+    topic = results.get('topic') or job.meta["topic"]
+    renditions = {
+        "markdown": report_md.encode("utf-8"),
+        "html": _report_html(topic, report_md).encode("utf-8"),
+    }
+    try:
+        for fmt, data in renditions.items():
+            await report_store.save(job.user_id, job.session_id, fmt, data, topic)
+    except Exception as e:
+        # The report still reaches the client in the complete event
+        print(f"[_store_report] Could not store report for {job.session_id}: {e}", file=sys.stderr)
+        return {}
+    return {fmt: report_url(job.session_id, fmt) for fmt in renditions}
+
+async def _run_research(job: Job) -> dict:
+    """Job runner: drive the research graph and publish its events on the job."""
+    session_id = job.session_id
+    topic = job.meta["topic"]
+    stored_results = {}  # Store final results as they become available
+    projector = EventProjector(job.meta.get("stream_mode"))
+
+    try:
+        job.emit({'type': 'start', 'session_id': session_id, 'topic': topic, 'stream_mode': projector.mode})
+
+        # Prepare payload with user-specified parameters
+        payload = {
+            "topic": topic,
+            "max_analysts": job.meta["max_analysts"],
+            "human_analyst_feedback": "continue"
+        }
+
+        # Stream events from the research graph, filtered and encoded once by the projector
+        run_cfg = _thread_cfg(session_id, llm_routes=job.meta.get("llm_routes"))
+        async for event in research_graph.astream_events(payload, run_cfg):
+            encoded = projector.encode(event)
+            if encoded is not None:
+                job.emit(encoded)
+
+            # Capture final results as they become available
+            if event.get("name") == "finalize_report" and event.get("event") == "on_chain_end":
+                output = event.get("data", {}).get("output")
+                if isinstance(output, dict) and output.get("final_report"):
+                    stored_results = {
+                        'topic': topic,
+                        'final_report': output['final_report'],
+                        'introduction': '',
+                        'conclusion': '',
+                        'sections': [],
+                        'analysts': []
+                    }
+                    print(f"CAPTURED FINAL RESULTS: {len(output['final_report'])} chars", file=sys.stderr)
+
+        # The checkpointed state has every field, not just the final report
+        try:
+            final_state = await research_graph.aget_state(_thread_cfg(session_id))
+            if final_state and final_state.values:
+                state_values = final_state.values
+                stored_results = {
+                    'topic': state_values.get('topic', topic),
+                    'final_report': state_values.get('final_report', '') or stored_results.get('final_report', ''),
+                    'introduction': state_values.get('introduction', ''),
+                    'conclusion': state_values.get('conclusion', ''),
+                    'sections': state_values.get('sections', []),
+                    'analysts': [a.model_dump() if hasattr(a, 'model_dump') else a for a in state_values.get('analysts', [])]
+                }
+        except Exception as state_error:
+            print(f"Could not read final graph state: {state_error}", file=sys.stderr)
+
+        if job.user_id is not None:
+            await _write_log(job.user_id, "stream_complete", f"Stream completed for topic: {topic}", session_id)
+
+        reports = await _store_report(job, stored_results)
+        # Runs on overridden model routes are not indexed: the index does not tell them apart
+        if not job.meta.get("llm_routes"):
+            try:
+                await topic_index.record(topic, job.meta["max_analysts"], session_id, stored_results)
+            except Exception as e:
+                print(f"[_run_research] Could not index result for {session_id}: {e}", file=sys.stderr)
+
+        # Send completion event with results
+        print(f"SENDING COMPLETION EVENT WITH RESULTS: {len(stored_results.get('final_report', '')) if stored_results else 0} chars", file=sys.stderr)
+        job.meta["stream"] = projector.stats()
+        job.emit({
+            "type": "complete",
+            "session_id": session_id,
+            "message": "Research completed successfully",
+            "results": stored_results or _empty_results(topic),
+            "reports": reports,
+            "stream": job.meta["stream"]
+        })
+        return stored_results
+
+    except asyncio.CancelledError:
+        job.emit({"type": "error", "error": "Research cancelled", "session_id": session_id})
+        raise
+    except Exception as e:
+        job.emit({"type": "error", "error": str(e), "session_id": session_id})
+        raise
+    finally:
+        job.meta["stream"] = projector.stats()
+        record_session(projector)
+
+async def _serve_reused(match: TopicMatch, job: Job) -> dict:
+    """Job runner: replay a matching earlier run's result instead of running the graph."""
+    session_id = job.session_id
+    reused = match.info()
+    job.emit({'type': 'start', 'session_id': session_id, 'topic': job.meta["topic"], 'reused': reused})
+    job.emit({'type': 'reused', 'session_id': session_id, **reused})
+    reports = await _store_report(job, match.results)
+    await _write_log(job.user_id, "reused", f"Served from session {match.session_id} ({reused['match']})", session_id)
+    job.emit({
+        "type": "complete",
+        "session_id": session_id,
+        "message": f"Served from an earlier run of '{match.topic}'; request again with reuse=false for a fresh run",
+        "results": match.results,
+        "reports": reports,
+        "reused": reused,
+    })
+    return match.results
+
+def _flight_key(topic: str, max_analysts: int, stream_mode: str, llm_routes: dict | None = None) -> str:
+    key = f"{normalize_topic(topic)}|{max_analysts}|{stream_mode}"
+    if llm_routes:
+        key += "|" + ",".join(f"{node}={profile}" for node, profile in sorted(llm_routes.items()))
+    return key
+
+def _event_type(event: bytes) -> str | None:
+    prefix = b'{"type":"'
+    if not event.startswith(prefix):
+        return None
+    return event[len(prefix):event.find(b'"', len(prefix))].decode()
+
+async def _follow_run(leader: Job, job: Job) -> dict:
+    """Job runner: relay an identical run already executing in this process instead of starting another."""
+    session_id = job.session_id
+    try:
+        job.emit({'type': 'start', 'session_id': session_id, 'topic': job.meta["topic"], 'follows': leader.session_id})
+        async for _, event in leader.stream():
+            # The leader's own start/complete/error frames name its session; this job sends its own
+            if _event_type(event) not in ("start", "complete", "error"):
+                job.emit(event)
+        if leader.status != COMPLETED:
+            raise RuntimeError(leader.error or f"Shared research run {leader.status}")
+
+        results = leader.result or _empty_results(job.meta["topic"])
+        reports = await _store_report(job, results)
+        await _write_log(job.user_id, "stream_complete", f"Followed run {leader.session_id}", session_id)
+        job.emit({
+            "type": "complete",
+            "session_id": session_id,
+            "message": "Research completed successfully",
+            "results": results,
+            "reports": reports,
+            "follows": leader.session_id,
+            "stream": leader.meta.get("stream"),
+        })
+        return results
+    except asyncio.CancelledError:
+        job.emit({"type": "error", "error": "Research cancelled", "session_id": session_id})
+        raise
+    except Exception as e:
+        job.emit({"type": "error", "error": str(e), "session_id": session_id})
+        raise
+
+async def _lead_run(flight_key: str, job: Job) -> dict:
+    """Job runner for a flight leader: with a cross-process lock, wait for another process's identical run."""
+    if flight_lock is None:
+        return await _run_research(job)
+    owner = f"{os.getpid()}:{job.session_id}"
+    while (holder := await flight_lock.try_acquire(flight_key, owner)) is not None:
+        job.emit({'type': 'waiting', 'session_id': job.session_id, 'follows_remote': holder})
+        await flight_lock.wait_released(flight_key)
+        match = None if job.meta.get("llm_routes") else await topic_index.find(job.meta["topic"], job.meta["max_analysts"])
+        if match is not None and match.similarity >= 1.0:
+            return await _serve_reused(match, job)
+        # The other run failed or was cancelled: try to take the key ourselves
+    try:
+        return await _run_research(job)
+    finally:
+        await flight_lock.release(flight_key, owner)
+
+async def _start_job(session_id: str, topic: str, max_analysts: int, user_id: int,
+                     stream_mode: str | None = None, reuse: bool = True,
+                     llm_routes: dict[str, str] | None = None) -> Job:
+    stream_mode = (stream_mode or RESEARCH_STREAM_MODE).lower()
+    if stream_mode not in STREAM_MODES:
+        raise ValueError(f"stream_mode must be one of {', '.join(STREAM_MODES)}")
+    llm_routes = validate_routes(llm_routes)
+    existing = research_jobs.get(session_id)
+    if existing is not None and existing.user_id != user_id:
+        raise PermissionError(session_id)
+    owner = await session_owner(session_id)
+    if owner is not None and owner != user_id:
+        raise PermissionError(session_id)
+    # Indexed runs used the default routes, so a run with overrides never reuses one
+    if reuse and not llm_routes and (existing is None or existing.status in (FAILED, CANCELLED)):
+        match = await topic_index.find(topic, max_analysts)
+        if match is not None:
+            return research_jobs.submit(session_id, functools.partial(_serve_reused, match), user_id=user_id,
+                                        immediate=True, agent="research-agent", topic=topic,
+                                        max_analysts=max_analysts, stream_mode=stream_mode, reused=match.info())
+    # Identical concurrent requests share one run: later ones follow the first
+    flight_key = _flight_key(topic, max_analysts, stream_mode, llm_routes)
+    return research_jobs.submit(session_id, functools.partial(_lead_run, flight_key), user_id=user_id,
+                                flight_key=flight_key, follower=_follow_run, agent="research-agent",
+                                topic=topic, max_analysts=max_analysts, stream_mode=stream_mode,
+                                llm_routes=llm_routes)
+
+def _owned_job(session_id: str, user: Principal) -> Job:
+    job = research_jobs.get(session_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Research session not found")
+    return job
+
 @router.post("/run-research", response_model=AgentResponse)
 async def run_research_agent(
     request: AgentRequest,
-    current_user: Profile = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Trigger research agent execution (streaming happens separately)"""
+    """Queue a research job; clients follow it on /research-stream with the returned session_id"""
+    session_id = request.session_id or str(uuid.uuid4())
     try:
-        # Generate session ID
-        session_id = request.session_id or str(uuid.uuid4())
-
-        # Log the agent execution start
-        db_log = Log(
-            user_id=current_user.id,
-            agent="research-agent",
-            stage="start",
-            message=f"Research triggered for topic: {request.topic}"
-        )
-        db.add(db_log)
-        db.commit()
-
-        # Don't run research here - let streaming endpoint handle it
-        # Just return success immediately so frontend can start streaming
-        return AgentResponse(
-            session_id=session_id,
-            status="started",
-            message=f"Research started for topic: {request.topic}. Connecting to live stream..."
-        )
-
-    except Exception as e:
-        # Log error
-        error_log = Log(
-            user_id=current_user.id,
-            agent="research-agent",
-            stage="error",
-            message=f"Failed to start research: {str(e)}"
-        )
-        db.add(error_log)
-        db.commit()
-
-        raise HTTPException(status_code=500, detail=f"Failed to start research: {str(e)}")
+        job = await _start_job(session_id, request.topic, request.max_analysts, current_user.id,
+                               request.stream_mode, request.reuse, request.llm_routes)
+    except PermissionError:
+        raise HTTPException(status_code=404, detail="Research session not found")
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Log the agent execution start
+    await _write_log(current_user.id, "start", f"Research triggered for topic: {request.topic}", session_id)
+
+    if job.meta.get("reused"):
+        message = f"Serving an earlier run of '{job.meta['reused']['matched_topic']}'. Connecting to live stream..."
+    else:
+        message = f"Research started for topic: {request.topic}. Connecting to live stream..."
+    return AgentResponse(session_id=session_id, status=job.status, message=message)
+
+@router.get("/research/{session_id}")
+async def research_status(session_id: str, current_user: Principal = Depends(get_current_user)):
+    """Status of a research job"""
+    return _owned_job(session_id, current_user).info()
+
+@router.post("/research/{session_id}/cancel")
+async def cancel_research(session_id: str, current_user: Principal = Depends(get_current_user)):
+    """Cancel a queued or running research job; a run other sessions follow stops once they are done"""
+    job = _owned_job(session_id, current_user)
+    cancelled = research_jobs.cancel(session_id)
+    return {"session_id": session_id, "cancelled": cancelled, "deferred": job.cancel_requested and not job.done}
 
 @router.get("/research-stream")
 async def stream_research(
@@ -86,158 +335,53 @@ async def stream_research(
     topic: str,
     max_analysts: int = 2,
     token: str = None,  # Accept token as URL parameter
-    db: Session = Depends(get_db)
+    session_id: str = None,
+    last_event_id: int = 0,
+    mode: str = None,  # "compact" or "full"; applies when this request starts the job
+    reuse: bool = True,  # false forces a fresh run even if a recent run matches the topic
+    llm_routes: str = None,  # JSON object of graph node (or "*") -> model profile, as on /run-research
 ):
-    """Stream research agent execution in real-time"""
-    session_id = str(uuid.uuid4())
+    """Follow a research job's events; starts the job if no job exists for the session yet.
 
-    # Validate token and get user
-    if not token:
-        error_data = {"type": "error", "error": "No authentication token provided"}
-        async def error_generate():
-            yield f"data: {json.dumps(error_data)}\n\n".encode()
-        return StreamingResponse(error_generate(), media_type="text/event-stream")
+    A reconnecting EventSource sends the Last-Event-ID header and receives only the events it missed.
+    """
+    session_id = session_id or str(uuid.uuid4())
+    resume_after = sse_resume_id(request, last_event_id)
 
-    try:
-        from .auth import SECRET_KEY, ALGORITHM, jwt
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise ValueError("Invalid token")
-        user = db.query(Profile).filter(Profile.email == email).first()
-        if user is None:
-            raise ValueError("User not found")
-    except Exception:
-        error_data = {"type": "error", "error": "Invalid authentication token"}
+    def error_response(message: str) -> StreamingResponse:
         async def error_generate():
-            yield f"data: {json.dumps(error_data)}\n\n".encode()
+            yield f"data: {json.dumps({'type': 'error', 'error': message})}\n\n".encode()
         return StreamingResponse(error_generate(), media_type="text/event-stream")
 
-    async def generate() -> AsyncGenerator[bytes, None]:
-        stored_results = {}  # Store final results as they become available
+    # Validate token and get user
+    if not token:
+        return error_response("No authentication token provided")
+
+    user = await resolve_principal(token)
+    if user is None:
+        return error_response("Invalid authentication token")
 
+    job = research_jobs.get(session_id)
+    if job is not None and job.user_id != user.id:
+        return error_response("Research session not found")
+    if job is None:
         try:
-            # Log start
-            yield f"data: {json.dumps({'type': 'start', 'session_id': session_id, 'topic': topic})}\n\n".encode()
-
-            # Prepare payload with user-specified parameters
-            payload = {
-                "topic": topic,
-                "max_analysts": max_analysts,
-                "human_analyst_feedback": "continue"
-            }
+            routes = json.loads(llm_routes) if llm_routes else None
+        except ValueError as e:
+            return error_response(f"llm_routes is not valid JSON: {e}")
+        if routes is not None and not isinstance(routes, dict):
+            return error_response("llm_routes must be a JSON object")
+        try:
+            job = await _start_job(session_id, topic, max_analysts, user.id, mode, reuse, routes)
+        except PermissionError:
+            return error_response("Research session not found")
+        except (JobQueueFull, ValueError) as e:
+            return error_response(str(e))
 
-            # Stream events from the research graph
-            async for event in research_graph.astream_events(payload, _thread_cfg(session_id)):
-                # Convert event data to JSON-serializable format
-                event_data = {
-                    "type": "event",
-                    "event": event.get("event"),
-                    "name": event.get("name", ""),
-                    "data": str(event.get("data", {})),  # Convert to string to avoid JSON issues
-                    "tags": list(event.get("tags", [])) if event.get("tags") else [],
-                    "timestamp": str(event.get("timestamp")) if event.get("timestamp") else ""
-                }
-                yield f"data: {json.dumps(event_data)}\n\n".encode()
-
-                # Capture final results as they become available
-                if event.get("name") == "finalize_report":
-                    try:
-                        event_values = event.get("data", {})
-                        print(f"DEBUG: finalize_report event data keys: {list(event_values.keys()) if isinstance(event_values, dict) else 'not dict'}", file=sys.stderr)
-
-                        final_report = None
-
-                        if isinstance(event_values, dict):
-                            # Check for final_report in nested output structure (most common)
-                            if 'output' in event_values and isinstance(event_values['output'], dict):
-                                if 'final_report' in event_values['output']:
-                                    final_report = event_values['output']['final_report']
-                                    print(f"Found final_report in output", file=sys.stderr)
-                            # Also check root level
-                            elif 'final_report' in event_values:
-                                final_report = event_values['final_report']
-                                print(f"Found final_report in root level", file=sys.stderr)
-                            # Check chunk level
-                            elif 'chunk' in event_values and isinstance(event_values['chunk'], dict):
-                                if 'final_report' in event_values['chunk']:
-                                    final_report = event_values['chunk']['final_report']
-                                    print(f"Found final_report in chunk", file=sys.stderr)
-
-                        if final_report:
-                            stored_results = {
-                                'topic': payload.get('topic', topic),
-                                'final_report': final_report,
-                                'introduction': '',  # Will be extracted from final_report if needed
-                                'conclusion': '',    # Will be extracted from final_report if needed
-                                'sections': [],      # Not available in final_report return
-                                'analysts': []       # Not available in final_report return
-                            }
-                            print(f"CAPTURED FINAL RESULTS: {len(final_report)} chars", file=sys.stderr)
-                            print(f"SAMPLE: {final_report[:200]}...", file=sys.stderr)
-                        else:
-                            print(f"NO final_report found in any location", file=sys.stderr)
-                    except Exception as capture_error:
-                        print(f"Failed to capture results: {capture_error}", file=sys.stderr)
-                        import traceback
-                        print(f"Traceback: {traceback.format_exc()}", file=sys.stderr)
-
-                # Log important events
-                if event.get("event") == "end":
-                    log_entry = Log(
-                        user_id=user.id,
-                        agent="research-agent",
-                        stage="stream_complete",
-                        message=f"Stream completed for topic: {topic}"
-                    )
-                    db.add(log_entry)
-                    db.commit()
-
-                    # Final fallback: try to get results from the graph state at the end
-                    if not stored_results:
-                        try:
-                            print(f"FINAL FALLBACK: Attempting to get results from graph state", file=sys.stderr)
-                            config = {"configurable": {"thread_id": session_id}}
-                            final_state = research_graph.get_state(config)
-                            if final_state and 'values' in final_state:
-                                state_values = final_state['values']
-                                print(f"FINAL FALLBACK: State keys: {list(state_values.keys())}", file=sys.stderr)
-                                stored_results = {
-                                    'topic': state_values.get('topic', topic),
-                                    'final_report': state_values.get('final_report', ''),
-                                    'introduction': state_values.get('introduction', ''),
-                                    'conclusion': state_values.get('conclusion', ''),
-                                    'sections': state_values.get('sections', []),
-                                    'analysts': state_values.get('analysts', [])
-                                }
-                                print(f"FINAL FALLBACK: Captured {len(stored_results.get('final_report', ''))} chars", file=sys.stderr)
-                        except Exception as fallback_error:
-                            print(f"FINAL FALLBACK failed: {fallback_error}", file=sys.stderr)
-
-            # Send completion event with results
-            completion_data = {
-                "type": "complete",
-                "session_id": session_id,
-                "message": "Research completed successfully",
-                "results": stored_results if stored_results else {
-                    'topic': topic,
-                    'final_report': 'Research completed successfully. Results will be available shortly.',
-                    'introduction': '',
-                    'conclusion': '',
-                    'sections': [],
-                    'analysts': []
-                }
-            }
-            print(f"SENDING COMPLETION EVENT WITH RESULTS: {len(stored_results.get('final_report', '')) if stored_results else 0} chars", file=sys.stderr)
-            yield f"data: {json.dumps(completion_data, ensure_ascii=False)}\n\n".encode()
-
-        except Exception as e:
-            error_data = {
-                "type": "error",
-                "error": str(e),
-                "session_id": session_id
-            }
-            yield f"data: {json.dumps(error_data)}\n\n".encode()
+    async def generate() -> AsyncGenerator[bytes, None]:
+        # Disconnecting only detaches this subscriber; the job keeps running
+        async for event_id, event in job.stream(resume_after):
+            yield sse_frame(event_id, event)
 
     return StreamingResponse(
         generate(),
@@ -250,48 +394,90 @@ async def stream_research(
 
 @router.get("/user-sessions")
 async def get_user_sessions(
-    current_user: Profile = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get user's research sessions and logs"""
-    logs = db.query(Log).filter(Log.user_id == current_user.id).order_by(Log.created_at.desc()).limit(50).all()
-
-    sessions = {}
-    for log in logs:
-        session_key = f"{log.agent}-{log.created_at.date()}"
-        if session_key not in sessions:
-            sessions[session_key] = {
-                "agent": log.agent,
-                "date": str(log.created_at.date()),
-                "logs": []
-            }
-        sessions[session_key]["logs"].append({
-            "stage": log.stage,
-            "message": log.message,
-            "timestamp": str(log.created_at)
-        })
+    """Get user's research sessions, newest first; pass `next_cursor` back as `cursor` for the next page"""
+    query = (select(ResearchSession)
+             .where(ResearchSession.user_id == current_user.id)
+             .order_by(ResearchSession.created_at.desc(), ResearchSession.id.desc())
+             .limit(limit + 1))
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(ResearchSession.created_at, ResearchSession.id) < tuple_(created_at, last_id))
+    sessions = (await db.execute(query)).scalars().all()
+    page, more = sessions[:limit], len(sessions) > limit
+
+    # Log totals for this page only, straight off the (user_id, session_id, timestamp) index
+    counts = {}
+    if page:
+        rows = await db.execute(
+            select(Log.session_id, func.count(Log.id), func.max(Log.timestamp))
+            .where(Log.user_id == current_user.id, Log.session_id.in_([s.id for s in page]))
+            .group_by(Log.session_id)
+        )
+        counts = {session_id: (count, last) for session_id, count, last in rows}
 
-    return {"sessions": list(sessions.values())}
+    return {
+        "sessions": [
+            {
+                "session_id": s.id,
+                "agent": s.agent,
+                "topic": s.topic,
+                "status": s.status,
+                "error": s.error,
+                "created_at": str(s.created_at),
+                "started_at": str(s.started_at) if s.started_at else None,
+                "finished_at": str(s.finished_at) if s.finished_at else None,
+                "log_count": counts.get(s.id, (0, None))[0],
+                "last_log_at": str(counts[s.id][1]) if s.id in counts else None,
+            }
+            for s in page
+        ],
+        "next_cursor": encode_cursor(page[-1].created_at, page[-1].id) if more else None,
+    }
 
 @router.get("/session/{session_id}/logs")
 async def get_session_logs(
     session_id: str,
-    current_user: Profile = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get logs for a specific session"""
-    # For now, return all user logs (in production, filter by session)
-    logs = db.query(Log).filter(Log.user_id == current_user.id).order_by(Log.created_at.desc()).all()
+    """Get one page of a session's logs; pass `next_cursor` back as `cursor` for the next page"""
+    key = tuple_(Log.timestamp, Log.id)
+    query = select(Log).where(Log.user_id == current_user.id, Log.session_id == session_id)
+    if order == "asc":
+        query = query.order_by(Log.timestamp.asc(), Log.id.asc())
+    else:
+        query = query.order_by(Log.timestamp.desc(), Log.id.desc())
+    if cursor:
+        try:
+            after = tuple_(*decode_cursor(cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(key > after if order == "asc" else key < after)
+    logs = (await db.execute(query.limit(limit + 1))).scalars().all()
+    page, more = logs[:limit], len(logs) > limit
 
     return {
         "session_id": session_id,
         "logs": [
             {
+                "id": log.id,
                 "stage": log.stage,
                 "message": log.message,
-                "timestamp": str(log.created_at),
+                "timestamp": str(log.timestamp),
                 "agent": log.agent
             }
-            for log in logs
-        ]
+            for log in page
+        ],
+        "next_cursor": encode_cursor(page[-1].timestamp, page[-1].id) if more else None,
     }
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import os
+import re
+
+from ..database import get_db
+from ..models import Report
+from ..principal_cache import Principal
+from ..report_store import EXTENSIONS, MEDIA_TYPES, report_store
+from .auth import get_current_user
+
+router = APIRouter(tags=["Reports"])
+
+_filename_re = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def report_url(session_id: str, fmt: str) -> str:
+    return f"/api/v1/reports/{session_id}/{fmt}"
+
+
+def _accepts(request: Request, codec: str) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == codec:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _not_modified(request: Request, *etags: str) -> bool:
+    candidates = [c.strip() for c in request.headers.get("if-none-match", "").split(",")]
+    return "*" in candidates or any(etag in candidates or f"W/{etag}" in candidates for etag in etags)
+
+
+@router.get("/reports")
+async def list_reports(
+    session_id: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the user's stored reports, newest first"""
+    query = select(Report).where(Report.user_id == current_user.id)
+    if session_id:
+        query = query.where(Report.session_id == session_id)
+    reports = (await db.execute(query.order_by(Report.id.desc()).limit(limit))).scalars().all()
+    return {
+        "reports": [
+            {
+                "session_id": r.session_id,
+                "format": r.format,
+                "topic": r.topic,
+                "size": r.size,
+                "stored_size": r.stored_size,
+                "etag": f'"{r.digest}"',
+                "updated_at": str(r.updated_at),
+                "url": report_url(r.session_id, r.format),
+            }
+            for r in reports
+        ]
+    }
+
+
+@router.get("/reports/{session_id}/{fmt}")
+async def get_report(
+    request: Request,
+    session_id: str,
+    fmt: str,
+    download: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Serve a stored report; honours If-None-Match, and Range whenever the stored file is sent as-is"""
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown report format '{fmt}'")
+    report = (await db.execute(select(Report).where(
+        Report.user_id == current_user.id, Report.session_id == session_id, Report.format == fmt,
+    ))).scalar_one_or_none()
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    # Stored and decoded bytes are different representations, so each gets its own strong validator
+    as_stored = report.codec == "identity" or _accepts(request, report.codec)
+    plain_etag = f'"{report.digest}"'
+    etag = plain_etag if report.codec == "identity" or not as_stored else f'"{report.digest}-{report.codec}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if _not_modified(request, plain_etag, f'"{report.digest}-{report.codec}"'):
+        return Response(status_code=304, headers=headers)
+
+    path = report_store.path_for(report.digest, report.codec)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Report content is no longer available")
+    filename = None
+    if download:
+        filename = f"{_filename_re.sub('_', report.topic or session_id).strip('_')[:80] or 'report'}.{EXTENSIONS[fmt]}"
+
+    if as_stored:
+        # The blob is sent as stored (sendfile where the server supports it); Range applies to these bytes
+        if report.codec != "identity":
+            headers["Content-Encoding"] = report.codec
+        return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers=headers, filename=filename,
+                            content_disposition_type="attachment" if download else "inline")
+
+    content = await asyncio.to_thread(report_store.read, report.digest, report.codec)
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(content, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -1,12 +1,12 @@
-﻿from fastapi import APIRouter, Depends, Request
+﻿from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Any, Dict, AsyncGenerator
 import json, uuid
 
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import Log
+from ..log_sink import log_sink
+from ..jobs import Job, JobQueueFull, adapter_jobs, sse_frame, sse_resume_id
+from ..event_projection import RESEARCH_STREAM_MODE, STREAM_MODES, EventProjector, record_session
 
 # Import the research graph (with proper path handling)
 import sys
@@ -28,25 +28,34 @@ class InvokeIn(BaseModel):
     session_id: str | None = None
     user_id: int | None = None  # optional, to attach logs to a user
 
-def _thread_cfg(session_id: str | None) -> Dict[str, Any]:
-    return {"configurable": {"thread_id": session_id or str(uuid.uuid4())}}
+def _thread_cfg(session_id: str | None, priority: str = "interactive",
+                llm_routes: Dict[str, str] | None = None) -> Dict[str, Any]:
+    # llm_priority orders this run's model calls in the shared rate limiter (interactive before batch);
+    # llm_routes remaps graph nodes to model profiles for this run only
+    metadata: Dict[str, Any] = {"llm_priority": priority}
+    if llm_routes:
+        metadata["llm_routes"] = llm_routes
+    return {"configurable": {"thread_id": session_id or str(uuid.uuid4())}, "metadata": metadata}
 
-def save_log(db: Session, user_id: int | None, agent: str, stage: str, message: str):
-    if user_id is None:
-        return
-    db.add(Log(user_id=user_id, agent=agent, stage=stage, message=message))
-    db.commit()
+def _adapter_thread(session_id: str | None) -> str | None:
+    # Kept apart from the frontend's threads and document stores, which use the bare session id
+    return f"adapter:{session_id}" if session_id else None
+
+async def save_log(user_id: int | None, agent: str, stage: str, message: str,
+                   session_id: str | None = None):
+    # Queued for a batched insert; streaming never waits on a per-event commit
+    await log_sink.write(user_id, agent, stage, message, session_id)
 
 @router.post("/invoke")
-async def invoke(inp: InvokeIn, db: Session = Depends(get_db)):
+async def invoke(inp: InvokeIn):
     payload = dict(inp.input or {})
     payload.setdefault("human_analyst_feedback", "continue")
 
-    state = await research_graph.ainvoke(payload, _thread_cfg(inp.session_id))
+    state = await research_graph.ainvoke(payload, _thread_cfg(_adapter_thread(inp.session_id), "batch"))
 
     # persist any internal events if present
     for evt in state.get("events", []):
-        save_log(db, inp.user_id, "research", evt.get("stage","event"), json.dumps(evt))
+        await save_log(inp.user_id, "research", evt.get("stage","event"), json.dumps(evt), inp.session_id)
 
     return JSONResponse({
         "ok": True,
@@ -60,24 +69,45 @@ async def invoke(inp: InvokeIn, db: Session = Depends(get_db)):
     })
 
 @router.get("/stream")
-async def stream(request: Request, db: Session = Depends(get_db),
+async def stream(request: Request,
                  session_id: str | None = None, topic: str | None = None,
-                 max_analysts: int = 5, user_id: int | None = None):
-    async def gen() -> AsyncGenerator[bytes, None]:
+                 max_analysts: int = 5, user_id: int | None = None,
+                 last_event_id: int = 0, mode: str | None = None):
+    session_id = session_id or str(uuid.uuid4())
+
+    async def run(job: Job):
         initial = {
-            "topic": topic or "Competitive analysis",
-            "max_analysts": max_analysts,
+            "topic": job.meta["topic"],
+            "max_analysts": job.meta["max_analysts"],
             "human_analyst_feedback": "continue",
         }
-        async for event in research_graph.astream_events(initial, _thread_cfg(session_id)):
-            payload = {
-                "agent": "research",
-                "event": event.get("event"),
-                "data":  event.get("data"),
-                "tags":  event.get("tags"),
-            }
-            save_log(db, user_id, "research", payload["event"] or "event", json.dumps(payload))
-            yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
-            if await request.is_disconnected():
-                break
+        projector = EventProjector(job.meta["stream_mode"])
+        try:
+            async for event in research_graph.astream_events(initial, _thread_cfg(_adapter_thread(job.session_id))):
+                encoded = projector.encode(event, agent="research")
+                if encoded is None:
+                    continue
+                await save_log(job.user_id, "research", event.get("event") or "event", encoded.decode("utf-8"),
+                               session_id=job.session_id)
+                job.emit(encoded)
+        finally:
+            job.meta["stream"] = projector.stats()
+            record_session(projector)
+
+    job = adapter_jobs.get(session_id)
+    if job is None:
+        try:
+            stream_mode = (mode or RESEARCH_STREAM_MODE).lower()
+            if stream_mode not in STREAM_MODES:
+                return JSONResponse({"ok": False, "error": f"mode must be one of {', '.join(STREAM_MODES)}"},
+                                    status_code=400)
+            job = adapter_jobs.submit(session_id, run, user_id=user_id, agent="research",
+                                       topic=topic or "Competitive analysis", max_analysts=max_analysts, stream_mode=stream_mode)
+        except JobQueueFull as e:
+            return JSONResponse({"ok": False, "error": str(e)}, status_code=429)
+
+    async def gen() -> AsyncGenerator[bytes, None]:
+        # The run belongs to the job; a dropped client only stops its own replay
+        async for event_id, payload in job.stream(sse_resume_id(request, last_event_id)):
+            yield sse_frame(event_id, payload)
     return StreamingResponse(gen(), media_type="text/event-stream")
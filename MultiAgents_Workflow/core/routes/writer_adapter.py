@@ -6,9 +6,9 @@ from typing import Any, Dict, AsyncGenerator
 import json
 import uuid
 
-from MultiAgents_Workflow.agents.ReportAgent.graph.graph import build_writer_from_markdown_graph
+from MultiAgents_Workflow.agents.graph_registry import graph_registry
 
-writer_graph = build_writer_from_markdown_graph().compile()
+writer_graph = graph_registry.get("writer")
 
 router = APIRouter(tags=["Writer Agent Adapter"])
 
@@ -21,14 +21,15 @@ def _thread_cfg(session_id: str | None) -> Dict[str, Any]:
     return {"configurable": {"thread_id": tid}}
 
 @router.post("/invoke")
-def invoke(inp: InvokeIn):
+async def invoke(inp: InvokeIn):
     # expected input layout:
     # {
     #   "task": "...",
     #   "finalize_report": { "final_report": "<markdown>" },
     #   "analysis": {...}, "notes": {...}, "theme": {...}
     # }
-    state = writer_graph.invoke(inp.input, _thread_cfg(inp.session_id))
+    # Unauthenticated adapter: renders only; reports are stored by the authenticated research jobs
+    state = await writer_graph.ainvoke(inp.input, _thread_cfg(inp.session_id))
     return JSONResponse({
         "ok": True,
         "output": {
@@ -0,0 +1,74 @@
+"""Persistence of research sessions and keyset cursors for the session/log endpoints.
+
+Every research job has a `ResearchSession` row keyed by its session id; the job
+engine's status listener keeps its status and timings current. Log and session
+listings page with opaque keyset cursors - `(timestamp, id)` of the last row
+seen - so a page costs the same however deep into the history it is.
+"""
+import base64
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from .database import sessionlocal
+from .jobs import Job, QUEUED, RUNNING
+from .models import ResearchSession
+
+
+def _utc(ts: Optional[float]) -> Optional[datetime]:
+    # Naive UTC, like the timestamps the log sink writes
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None) if ts else None
+
+
+async def session_owner(session_id: str) -> Optional[int]:
+    """User id of the stored session `session_id`, or None if there is no such row."""
+    async with sessionlocal() as db:
+        session = await db.get(ResearchSession, session_id)
+        return session.user_id if session is not None else None
+
+
+async def record_job_status(job: Job, status: str):
+    """Job engine listener: upsert the session row for `job`; a row of another user is never taken over."""
+    if job.user_id is None:
+        return
+    async with sessionlocal() as db:
+        session = await db.get(ResearchSession, job.session_id)
+        if session is not None and session.user_id != job.user_id:
+            print(f"[sessions] Session {job.session_id} belongs to another user; not recording", file=sys.stderr)
+            return
+        if session is None or status == QUEUED:
+            # A re-run of a failed/cancelled session starts its row over
+            session = await db.merge(ResearchSession(
+                id=job.session_id,
+                user_id=job.user_id,
+                agent=job.meta.get("agent", "research-agent"),
+                topic=job.meta.get("topic") or "",
+                created_at=_utc(job.created_at),
+            ))
+        session.status = status
+        session.started_at = _utc(job.started_at) if status != QUEUED else None
+        session.finished_at = _utc(job.finished_at) if status not in (QUEUED, RUNNING) else None
+        session.error = job.error
+        await db.commit()
+
+
+def track_sessions(engine):
+    """Persist the status of every job `engine` runs."""
+    engine.add_listener(record_job_status)
+    print(f"[sessions] Recording {engine.name} job sessions", file=sys.stderr)
+
+
+def encode_cursor(timestamp, row_id) -> str:
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """`(timestamp, id)` from a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
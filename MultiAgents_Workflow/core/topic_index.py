@@ -0,0 +1,173 @@
+"""Index of completed research runs for reusing their results on repeated topics.
+
+A finished run is recorded under its normalized topic and `max_analysts`, with
+its results stored in the report store. A later request with the same key -
+or, when TOPIC_REUSE_THRESHOLD < 1, a topic whose character-trigram similarity
+reaches the threshold - within TOPIC_REUSE_MAX_AGE_HOURS is served from that
+result instead of running the graph again. Requests opt out with `reuse=false`.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from .database import sessionlocal
+from .event_projection import dumps
+from .models import TopicRun
+from .report_store import report_store
+
+load_dotenv()
+
+
+TOPIC_REUSE_ENABLED = os.getenv("TOPIC_REUSE_ENABLED", "true").lower() not in ("0", "false", "no")
+TOPIC_REUSE_THRESHOLD = float(os.getenv("TOPIC_REUSE_THRESHOLD", "0.85"))  # 1.0: exact topics only
+TOPIC_REUSE_MAX_AGE_HOURS = float(os.getenv("TOPIC_REUSE_MAX_AGE_HOURS", "168"))
+TOPIC_REUSE_CANDIDATES = int(os.getenv("TOPIC_REUSE_CANDIDATES", "500"))
+
+_non_word_re = re.compile(r"[^\w\s]+")
+_space_re = re.compile(r"\s+")
+_number_re = re.compile(r"\d+")
+
+
+def normalize_topic(topic: str) -> str:
+    """Case-, accent-, punctuation- and whitespace-insensitive form of a topic."""
+    text = unicodedata.normalize("NFKD", topic or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _space_re.sub(" ", _non_word_re.sub(" ", text)).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def topic_similarity(a: str, b: str) -> float:
+    """Dice coefficient of the character trigrams of two normalized topics.
+
+    Topics that both name numbers (years, versions) only match if they name the same ones.
+    """
+    na, nb = set(_number_re.findall(a)), set(_number_re.findall(b))
+    if na and nb and na != nb:
+        return 0.0
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class TopicMatch:
+    session_id: str
+    topic: str
+    similarity: float
+    created_at: datetime
+    results: dict
+
+    def info(self) -> dict:
+        return {
+            "source_session_id": self.session_id,
+            "matched_topic": self.topic,
+            "match": "exact" if self.similarity >= 1.0 else "similar",
+            "similarity": round(self.similarity, 3),
+            "completed_at": str(self.created_at),
+        }
+
+
+class TopicIndex:
+    def __init__(self, threshold: float = TOPIC_REUSE_THRESHOLD, max_age_hours: float = TOPIC_REUSE_MAX_AGE_HOURS,
+                 candidates: int = TOPIC_REUSE_CANDIDATES, enabled: bool = TOPIC_REUSE_ENABLED):
+        self.threshold = threshold
+        self.max_age = timedelta(hours=max_age_hours)
+        self.candidates = candidates
+        self.enabled = enabled
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.recorded = 0
+
+    async def find(self, topic: str, max_analysts: int) -> Optional[TopicMatch]:
+        """The freshest matching run for `topic`, or None."""
+        if not self.enabled:
+            return None
+        self.lookups += 1
+        key = normalize_topic(topic)
+        cutoff = _utcnow() - self.max_age
+        async with sessionlocal() as db:
+            run = (await db.execute(
+                select(TopicRun)
+                .where(TopicRun.normalized_topic == key, TopicRun.max_analysts == max_analysts,
+                       TopicRun.created_at >= cutoff)
+                .order_by(TopicRun.created_at.desc()).limit(1)
+            )).scalar_one_or_none()
+            similarity = 1.0
+            if run is None and self.threshold < 1.0:
+                recent = (await db.execute(
+                    select(TopicRun)
+                    .where(TopicRun.max_analysts == max_analysts, TopicRun.created_at >= cutoff)
+                    .order_by(TopicRun.created_at.desc()).limit(self.candidates)
+                )).scalars().all()
+                scored = [(topic_similarity(key, r.normalized_topic), r) for r in recent]
+                scored = [(score, r) for score, r in scored if score >= self.threshold]
+                if scored:
+                    # Best score; the newest run wins a tie since `recent` is newest first
+                    similarity, run = max(scored, key=lambda pair: pair[0])
+        if run is None:
+            return None
+
+        try:
+            results = json.loads(await asyncio.to_thread(report_store.read, run.result_digest, run.result_codec))
+        except (OSError, ValueError) as e:
+            print(f"[topic_index] Stored result of {run.session_id} is unreadable: {e}", file=sys.stderr)
+            return None
+        if similarity >= 1.0:
+            self.exact_hits += 1
+        else:
+            self.similar_hits += 1
+        return TopicMatch(run.session_id, run.topic, similarity, run.created_at, results)
+
+    async def record(self, topic: str, max_analysts: int, session_id: str, results: dict):
+        """Index a completed run's results."""
+        if not self.enabled or not results.get("final_report"):
+            return
+        blob = await report_store.aput(dumps(results), "results")
+        async with sessionlocal() as db:
+            db.add(TopicRun(
+                normalized_topic=normalize_topic(topic),
+                max_analysts=max_analysts,
+                topic=topic,
+                session_id=session_id,
+                result_digest=blob.digest,
+                result_codec=blob.codec,
+                created_at=_utcnow(),
+            ))
+            await db.commit()
+        self.recorded += 1
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_age_hours": self.max_age.total_seconds() / 3600,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.lookups - hits,
+            "recorded": self.recorded,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+        }
+
+
+topic_index = TopicIndex()